@@ -0,0 +1,62 @@
+import struct
+
+import numpy as np
+
+# layout of a binary data point file: a header of BINARY_HEADER_SIZE bytes, <magic, version, number of data points,
+# capacity>, followed by the int64 columns in BINARY_COLUMNS, each of them has capacity slots, and the first ones are
+# the data points in arrival order
+BINARY_MAGIC = b'TYPOINTS'
+BINARY_VERSION = 1
+BINARY_HEADER_FORMAT = '<8sqqq'
+BINARY_HEADER_SIZE = 64
+BINARY_COLUMNS = ('arrival_time', 'generate_time', 'delay', 'value')
+
+
+class BinaryPointsWriter:
+    """
+    Write data points to a binary file, which is memory-mappable column by column, see BINARY_COLUMNS
+    """
+
+    def __init__(self, path, capacity) -> None:
+        """
+        Create a binary data point file, the header is written when the writer is closed
+        :param path: path of the file
+        :param capacity: maximal number of data points in the file
+        """
+        super().__init__()
+        self.capacity = capacity
+        self.row_number = 0
+        self.memmap = np.memmap(path, dtype=np.int64, mode='w+',
+                                shape=(BINARY_HEADER_SIZE // 8 + len(BINARY_COLUMNS) * max(capacity, 1),))
+        self.columns = self.memmap[BINARY_HEADER_SIZE // 8:].reshape(len(BINARY_COLUMNS), max(capacity, 1))
+
+    def write(self, points):
+        """
+        Append data points to the file
+        :param points: an int64 array of data points, each row is <arrival time, generate time, delay, value>
+        """
+        self.columns[:, self.row_number:self.row_number + len(points)] = points.T
+        self.row_number += len(points)
+
+    def close(self):
+        header = struct.pack(BINARY_HEADER_FORMAT, BINARY_MAGIC, BINARY_VERSION, self.row_number, self.capacity)
+        self.memmap[:BINARY_HEADER_SIZE // 8].view(np.uint8)[:len(header)] = np.frombuffer(header, dtype=np.uint8)
+        self.memmap.flush()
+        del self.columns, self.memmap
+
+
+def read_points(path):
+    """
+    Memory-map the columns of a binary data point file written by BinaryPointsWriter. The columns can be written to the
+    simulated structures directly, e.g., tlsm.write_many(points['generate_time'])
+    :param path: path of the file
+    :return: a dict from column name, see BINARY_COLUMNS, to a read-only int64 array, in arrival order
+    """
+    with open(path, 'rb') as file_in:
+        header = file_in.read(struct.calcsize(BINARY_HEADER_FORMAT))
+    magic, version, row_number, capacity = struct.unpack(BINARY_HEADER_FORMAT, header)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError(path + ' is not a binary data point file of version ' + str(BINARY_VERSION))
+    columns = np.memmap(path, dtype=np.int64, mode='r', offset=BINARY_HEADER_SIZE,
+                        shape=(len(BINARY_COLUMNS), max(capacity, 1)))
+    return {name: columns[i, :row_number] for i, name in enumerate(BINARY_COLUMNS)}
@@ -0,0 +1,32 @@
+import glob
+import os
+import tempfile
+
+import numpy as np
+
+
+def load_delays(path):
+    """
+    Load the delays in a text file, one integer delay per line. The text file is parsed once, and the delays are cached
+    in a .npy file next to it, named by the modification time of the text file, so that later loads memory-map the
+    cache instead of parsing the text file again.
+    :param path: path of the delay file
+    :return: an int64 array of the delays, read-only if it is loaded from the cache
+    """
+    cache_path = '%s.%d.npy' % (path, os.stat(path).st_mtime_ns)
+    if os.path.exists(cache_path):
+        return np.load(cache_path, mmap_mode='r')
+    delays = np.loadtxt(path, dtype=np.int64, ndmin=1)
+    try:
+        # remove the caches of earlier versions of the delay file
+        for stale_path in glob.glob(glob.escape(path) + '.*.npy'):
+            os.remove(stale_path)
+        # write to a temporary file first, and rename it, so that no process loads a partially written cache
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        with os.fdopen(file_descriptor, 'wb') as temporary_file:
+            np.save(temporary_file, delays)
+        os.replace(temporary_path, cache_path)
+    except OSError:
+        # the cache is optional, e.g., the directory may be read-only or another process removes the same stale cache
+        pass
+    return delays
@@ -0,0 +1,129 @@
+import itertools
+import sys
+
+import numpy as np
+
+from binary_points import BinaryPointsWriter
+from delay_set import load_delays
+
+
+def points2lines(points, delimiter=','):
+    """
+    Transform data points to lines of string. The arrival time, generate time and delay of a data point are concatenated
+    with given delimiter.
+    :param points: an int64 array of data points, each row is <arrival time, generate time, delay, value>
+    :param delimiter: delimiter for concatenating the values
+    :return: concatenated string, each line ending with '\n'
+    """
+    return (('%d' + delimiter + '%d' + delimiter + '%d\n') * len(points)) % tuple(points[:, :3].ravel().tolist())
+
+
+def progress(percent, width=100):
+    """
+    Show the progress of data generation
+    :param percent: percentage of tasks completed
+    :param width: The width of the progress bar
+    """
+    if percent > 1:
+        percent = 1
+    show_str = ('[%%-%ds]' % width) % (int(percent * width) * '#')
+    print('\r%s %s%%' % (show_str, int(percent * 100)), end='', file=sys.stdout, flush=True)
+
+
+def generate_points(delays, data_points_number, time_interval, block_size, rng):
+    """
+    Generate data points in blocks, in the order of generate time. The delays are sampled from the delay set.
+    :param delays: an array of delays
+    :param data_points_number: total number of data points to generate
+    :param time_interval: interval of generate time
+    :param block_size: number of data points in a block
+    :param rng: a numpy random generator
+    :return: an iterator of int64 arrays, each row is <arrival time, generate time, delay, value>
+    """
+    for start in range(0, data_points_number, block_size):
+        index = np.arange(start, min(start + block_size, data_points_number), dtype=np.int64)
+        gen_times = (index * time_interval).astype(np.int64)
+        block_delays = delays[rng.integers(0, len(delays), len(index))]
+        values = rng.integers(0, 1000000, len(index), endpoint=True)
+        yield np.column_stack((gen_times + block_delays, gen_times, block_delays, values))
+
+
+def reorder_points(blocks, window_size):
+    """
+    Reorder data points by arrival time with a bounded window. Each block is sorted together with the window_size
+    latest data points held from the previous blocks, and the others are released in arrival order. A released data
+    point arriving earlier than the last data point written is dropped, because arrival time is too early.
+    :param blocks: an iterator of data point blocks, given by generate_points
+    :param window_size: number of data points held for reordering
+    :return: an iterator of <data points to write, dropped data points>, both ordered by arrival time
+    """
+    held = np.empty((0, 4), dtype=np.int64)
+    max_arrival_time_in_file = -1
+    # None marks the end of the blocks, when all the held data points are released
+    for block in itertools.chain(blocks, [None]):
+        if block is None:
+            released = held
+        else:
+            merged = np.concatenate((held, block))
+            # sort by arrival time, then by generate time
+            merged = merged[np.lexsort((merged[:, 1], merged[:, 0]))]
+            released_number = max(len(merged) - window_size, 0)
+            released, held = merged[:released_number], merged[released_number:]
+        # the released data points are sorted, so the ones arriving too early are a prefix
+        dropped_number = np.searchsorted(released[:, 0], max_arrival_time_in_file, side='left')
+        if dropped_number < len(released):
+            max_arrival_time_in_file = released[-1, 0]
+        yield released[dropped_number:], released[:dropped_number]
+
+
+def job_rng(data_points_number, time_interval, seed=4834):
+    """
+    Create the random generator of a data generation job. Each (data_points_number, time_interval) has an independent
+    random stream, which does not depend on the other jobs or on the order of the jobs.
+    :param data_points_number: total number of data points to generate
+    :param time_interval: interval of generate time
+    :param seed: the seed shared by all the jobs
+    :return: a numpy random generator
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(data_points_number, time_interval)))
+
+
+def prepare_data(data_points_number, time_interval, output_file_name, output_formats, rng, delay_path='ty.txt',
+                 buffer_size=50000, show_progress=True):
+    """
+    Generate data points, and write them to files in arrival order
+    :param data_points_number: total number of data points to generate
+    :param time_interval: interval of generate time
+    :param output_file_name: path of the output file, without extension
+    :param output_formats: output formats, csv and/or bin
+    :param rng: a numpy random generator
+    :param delay_path: path of the delay file
+    :param buffer_size: number of data points generated in a block, and held for reordering
+    :param show_progress: show the progress bar or not
+    :return: number of data points written, and number of data points dropped
+    """
+    # number of data points written to the file
+    current_num = 0
+    dropped_num = 0
+
+    delays = load_delays(delay_path)
+    blocks = generate_points(delays, data_points_number, time_interval, buffer_size, rng)
+    csv_out = open(output_file_name + '.csv', 'w') if 'csv' in output_formats else None
+    binary_out = BinaryPointsWriter(output_file_name + '.bin', data_points_number) if 'bin' in output_formats else None
+    for points, dropped_points in reorder_points(blocks, buffer_size):
+        for point in dropped_points.tolist():
+            print('drop a data point', str(tuple(point)), 'because arrival time is too early.')
+        if csv_out is not None:
+            csv_out.write(points2lines(points))
+        if binary_out is not None:
+            binary_out.write(points)
+        current_num += len(points)
+        dropped_num += len(dropped_points)
+        if show_progress:
+            progress(float(current_num / data_points_number))
+    if csv_out is not None:
+        csv_out.close()
+    if binary_out is not None:
+        binary_out.close()
+    return current_num, dropped_num
+
@@ -1,21 +1,31 @@
+import heapq
+import math
+from fractions import Fraction
+
 from realdelay import *
-from sstable import SSTable
+from sstable import SSTable, ColumnarSSTable, MetricsSSTable
 
 
-def range_float(minimum, maximum, step):
+def time_grid(minimum, maximum, step):
     """
-    Generate an arithmetic sequence, given the minimum, maximum and step size
+    Generate an arithmetic sequence, given the minimum, maximum and step size. The value of tick i is computed as
+    minimum + i * step in exact decimal arithmetic and rounded to float once, so that the values do not drift from the
+    grid, e.g., the third value of time_grid(0.05, 20, 0.05) is 0.15 rather than 0.15000000000000002
     :param minimum: minimal value of the arithmetic sequence (inclusive)
-    :param maximum: maximal value of the arithmetic sequence (inclusive)
+    :param maximum: maximal value of the arithmetic sequence (inclusive, up to 4 decimal places)
     :param step: difference of two adjacent value in the arithmetic sequence
-    :return: a list, arithmetic sequence
+    :return: an array, arithmetic sequence
     """
-    result = []
-    current_value = minimum
-    while round(current_value,4) <= maximum:
-        result.append(current_value)
-        current_value += step
-    return result
+    minimum, step = Fraction(str(minimum)), Fraction(str(step))
+    # minimum and step as integers over a common denominator
+    denominator = math.lcm(minimum.denominator, step.denominator)
+    start, increment = int(minimum * denominator), int(step * denominator)
+    # number of ticks, a value is kept if it is not larger than maximum up to 4 decimal places
+    number = max(int((Fraction(str(maximum)) - minimum) // step) + 1, 0)
+    while round(float(minimum + number * step), 4) <= maximum:
+        number += 1
+    ticks = np.arange(number, dtype=np.int64)
+    return (start + ticks * increment) / denominator
 
 
 def generate_data_points_real_delay(time_interval, total_number, path='delay_milli.txt'):
@@ -26,11 +36,11 @@ def generate_data_points_real_delay(time_interval, total_number, path='delay_mil
     :param path: path of the delay file
     :return:
     """
-    gens = np.array(range_float(0, time_interval * total_number, time_interval))
+    gens = time_grid(0, time_interval * total_number, time_interval)
     delays = np.array(RealDelay(path=path).get_delays(np.size(gens, 0)))
     recvs = gens + delays
     pairs = np.array([gens, recvs]).T
-    sorted = pairs[pairs[:, 1].argsort()]
+    sorted = pairs[pairs[:, 1].argsort(kind='stable')]
     return sorted[:, 0]
 
 def generate_data_points_real_delay_with_delay(time_interval, total_number, path='delay_milli.txt'):
@@ -41,23 +51,28 @@ def generate_data_points_real_delay_with_delay(time_interval, total_number, path
     :param path: path of the delay file
     :return:
     """
-    gens = np.array(range_float(0, time_interval * total_number, time_interval))
+    gens = time_grid(0, time_interval * total_number, time_interval)
     delays = np.array(RealDelay(path=path).get_delays(np.size(gens, 0)))
     recvs = gens + delays
     data_points = np.array([gens, recvs, delays]).T
-    sorted_data_points = data_points[data_points[:, 1].argsort()]
+    sorted_data_points = data_points[data_points[:, 1].argsort(kind='stable')]
     return sorted_data_points
 
 def generate_data_points_with_delay(time_interval, total_number, mu=2.54436, sigma=0.612408):
-    data_points = []
-    for i in range(total_number):
-        generate_time = i * time_interval
-        delay = np.random.lognormal(mu, sigma)
-        arrival_time = delay + generate_time
-        data_points.append([generate_time, arrival_time, delay])
-    data_points = np.array(data_points)
-    sorted_data_points = data_points[data_points[:, 1].argsort()]
-    return sorted_data_points
+    """
+    Generate a collection of data points, with their arrival time and delay
+    :param time_interval: interval of generate time
+    :param total_number: total number of data points to generate
+    :param mu: parameter of lognormal distribution function, mu
+    :param sigma: parameter of lognormal distribution function, sigma
+    :return: an array of data points ordered by arrival time, each row is <generate time, arrival time, delay>
+    """
+    generate_times = np.arange(total_number) * time_interval
+    # draw all the delays at once, which gives the same delays as drawing them one by one
+    delays = np.random.lognormal(mu, sigma, total_number)
+    arrival_times = delays + generate_times
+    data_points = np.column_stack((generate_times, arrival_times, delays))
+    return data_points[np.argsort(arrival_times, kind='stable')]
 
 def generate_data_points(time_interval, total_number, mu=2.54436, sigma=0.612408):
     """
@@ -68,41 +83,312 @@ def generate_data_points(time_interval, total_number, mu=2.54436, sigma=0.612408
     :param sigma: parameter of lognormal distribution function, sigma
     :return: a collection data points, each data points is represented by its generate time
     """
-    data_points = []
-    for i in range(total_number):
-        generate_time = i * time_interval
-        arrival_time = np.random.lognormal(mu, sigma) + generate_time
-        data_points.append([generate_time, arrival_time])
-    data_points = np.array(data_points)
-    sorted_data_points = data_points[data_points[:, 1].argsort()]
-    collection = sorted_data_points[:, 0]
+    generate_times = np.arange(total_number) * time_interval
+    # draw all the delays at once, which gives the same delays as drawing them one by one
+    arrival_times = np.random.lognormal(mu, sigma, total_number) + generate_times
+    collection = generate_times[np.argsort(arrival_times, kind='stable')]
     return collection
 
 def generate_data_points_gpd(time_interval, total_number, mu=0, sigma=0.0224,ksi=-0.2):
-    data_points = []
-    for i in range(total_number):
-        generate_time = i * time_interval
-        arrival_time = np.random.pareto(mu, sigma) + generate_time
-        data_points.append([generate_time, arrival_time])
-    data_points = np.array(data_points)
-    sorted_data_points = data_points[data_points[:, 1].argsort()]
-    collection = sorted_data_points[:, 0]
+    """
+    Generate a collection of data points, whose delays follow a generalized pareto distribution
+    :param time_interval: interval of generate time
+    :param total_number: total number of data points to generate
+    :param mu: parameter of generalized pareto distribution, location
+    :param sigma: parameter of generalized pareto distribution, scale
+    :param ksi: parameter of generalized pareto distribution, shape
+    :return: a collection data points, each data points is represented by its generate time
+    """
+    generate_times = np.arange(total_number) * time_interval
+    # draw all the delays at once by inverse transform sampling
+    uniforms = np.random.random_sample(total_number)
+    if ksi == 0:
+        delays = mu - sigma * np.log1p(-uniforms)
+    else:
+        delays = mu + sigma * ((1 - uniforms) ** (-ksi) - 1) / ksi
+    arrival_times = delays + generate_times
+    collection = generate_times[np.argsort(arrival_times, kind='stable')]
     return collection
 
 
 
 
 
-def merge_sort(sstables, size_=None):
+def reorder_stream(blocks, min_delay=0, window_size=None):
+    """
+    Reorder a stream of data points by arrival time with a bounded window. A data point is released as soon as no later
+    data point can arrive before it, i.e., its arrival time is not larger than the latest generate time plus min_delay,
+    so that the stream is in the same order as sorting all the data points at once. If more than window_size data
+    points are held, the earliest ones are released anyway, and they may be followed by data points arriving earlier.
+    :param blocks: an iterator of <generate times, delays>, each of them is an array, in the order of generate time
+    :param min_delay: a lower bound of the delays
+    :param window_size: maximal number of data points held for reordering, unbounded if it is None
+    :return: an iterator of <generate times, arrival times, delays>, each of them is an array, in arrival order
+    """
+    held_generate_times = held_arrival_times = held_delays = np.empty(0)
+    for generate_times, delays in blocks:
+        if len(generate_times) == 0:
+            continue
+        generate_times = np.concatenate((held_generate_times, generate_times))
+        delays = np.concatenate((held_delays, delays))
+        arrival_times = np.concatenate((held_arrival_times, generate_times[len(held_generate_times):] +
+                                        delays[len(held_delays):]))
+        order = np.argsort(arrival_times, kind='stable')
+        generate_times, arrival_times, delays = generate_times[order], arrival_times[order], delays[order]
+        released_number = np.searchsorted(arrival_times, generate_times.max() + min_delay, side='right')
+        if window_size is not None:
+            released_number = max(released_number, len(arrival_times) - window_size)
+        held_generate_times = generate_times[released_number:]
+        held_arrival_times = arrival_times[released_number:]
+        held_delays = delays[released_number:]
+        yield generate_times[:released_number], arrival_times[:released_number], delays[:released_number]
+    yield held_generate_times, held_arrival_times, held_delays
+
+
+def lognormal_delay_blocks(time_interval, total_number=None, mu=2.54436, sigma=0.612408, chunk_size=65536):
+    """
+    Generate data points in blocks, in the order of generate time, with lognormal delays. The delays are drawn from the
+    global random generator of numpy, the same as generate_data_points.
+    :param time_interval: interval of generate time
+    :param total_number: total number of data points to generate, unbounded if it is None
+    :param mu: parameter of lognormal distribution function, mu
+    :param sigma: parameter of lognormal distribution function, sigma
+    :param chunk_size: number of data points in a block
+    :return: an iterator of <generate times, delays>
+    """
+    start = 0
+    while total_number is None or start < total_number:
+        end = start + chunk_size if total_number is None else min(start + chunk_size, total_number)
+        yield np.arange(start, end) * time_interval, np.random.lognormal(mu, sigma, end - start)
+        start = end
+
+
+def real_delay_blocks(time_interval, total_number=None, path='delay_milli.txt', chunk_size=65536):
+    """
+    Generate data points in blocks, in the order of generate time, with delays sampled from a delay file. The same as
+    generate_data_points_real_delay, total_number + 1 data points are generated, and the generate times are on
+    time_grid.
+    :param time_interval: interval of generate time
+    :param total_number: total number of data points to generate, unbounded if it is None
+    :param path: path of the delay file
+    :param chunk_size: number of data points in a block
+    :return: an iterator of <generate times, delays>
+    """
+    real_delay = RealDelay(path=path)
+    step = Fraction(str(time_interval))
+    start = 0
+    while total_number is None or start <= total_number:
+        end = start + chunk_size if total_number is None else min(start + chunk_size, total_number + 1)
+        ticks = np.arange(start, end, dtype=np.int64)
+        yield ticks * step.numerator / step.denominator, real_delay.get_delays(end - start)
+        start = end
+
+
+def stream_data_points(time_interval, total_number=None, mu=2.54436, sigma=0.612408, chunk_size=65536,
+                       window_size=None):
+    """
+    Generate data points as a stream of chunks, in arrival order, which can be written to the structures one chunk
+    after another, e.g., for chunk in stream_data_points(...): tlsm.write_many(chunk). With the same seed, the chunks
+    concatenated are the same as generate_data_points.
+    :param time_interval: interval of generate time
+    :param total_number: total number of data points to generate, unbounded if it is None
+    :param mu: parameter of lognormal distribution function, mu
+    :param sigma: parameter of lognormal distribution function, sigma
+    :param chunk_size: number of data points generated at a time
+    :param window_size: maximal number of data points held for reordering, unbounded if it is None
+    :return: an iterator of arrays of generate times
+    """
+    blocks = lognormal_delay_blocks(time_interval, total_number, mu, sigma, chunk_size)
+    for generate_times, _, _ in reorder_stream(blocks, 0, window_size):
+        yield generate_times
+
+
+def stream_data_points_with_delay(time_interval, total_number=None, mu=2.54436, sigma=0.612408, chunk_size=65536,
+                                  window_size=None):
+    """
+    Generate data points with their arrival time and delay as a stream of chunks, in arrival order, e.g., for chunk in
+    stream_data_points_with_delay(...): hybrid.write_many(chunk[:, 0], chunk[:, 2]). With the same seed, the chunks
+    concatenated are the same as generate_data_points_with_delay.
+    :param time_interval: interval of generate time
+    :param total_number: total number of data points to generate, unbounded if it is None
+    :param mu: parameter of lognormal distribution function, mu
+    :param sigma: parameter of lognormal distribution function, sigma
+    :param chunk_size: number of data points generated at a time
+    :param window_size: maximal number of data points held for reordering, unbounded if it is None
+    :return: an iterator of arrays, each row is <generate time, arrival time, delay>
+    """
+    blocks = lognormal_delay_blocks(time_interval, total_number, mu, sigma, chunk_size)
+    for generate_times, arrival_times, delays in reorder_stream(blocks, 0, window_size):
+        yield np.column_stack((generate_times, arrival_times, delays))
+
+
+def stream_data_points_real_delay(time_interval, total_number=None, path='delay_milli.txt', chunk_size=65536,
+                                  window_size=None):
+    """
+    Generate data points use real delay as a stream of chunks, in arrival order. With the same seed, the chunks
+    concatenated are the same as generate_data_points_real_delay, where data points arriving at the same time are also
+    in the order of generate time.
+    :param time_interval: interval of generate time
+    :param total_number: total number of data points to generate, unbounded if it is None
+    :param path: path of the delay file
+    :param chunk_size: number of data points generated at a time
+    :param window_size: maximal number of data points held for reordering, unbounded if it is None
+    :return: an iterator of arrays of generate times
+    """
+    blocks = real_delay_blocks(time_interval, total_number, path, chunk_size)
+    min_delay = RealDelay(path=path).delay_data.min()
+    for generate_times, _, _ in reorder_stream(blocks, min_delay, window_size):
+        yield generate_times
+
+
+def next_flush_segment(values, max_generate_time, sequential_room, nonsequential_room):
+    """
+    Split a batch of data points written to a tLSM structure into sequential and non-sequential ones, until one of the
+    buffers becomes full. Because the maximal generate time on LEVEL1 only changes when the sequential buffer is
+    flushed, all data points before that are split against the same maximal generate time.
+    :param values: an array of generate times, in arrival order
+    :param max_generate_time: maximal generate time on LEVEL1
+    :param sequential_room: number of data points the sequential buffer can take before it is full, a buffer with no
+    room is never full
+    :param nonsequential_room: number of data points the non-sequential buffer can take before it is full
+    :return: the number of data points to write before checking the buffers, and a boolean array marking which of
+    them are sequential
+    """
+    if sequential_room > 0 and nonsequential_room > 0:
+        # one of the buffers must be full after sequential_room + nonsequential_room data points, but look at a
+        # smaller window first when a buffer is about to be full
+        window = min(sequential_room + nonsequential_room, max(64, 2 * min(sequential_room, nonsequential_room)))
+    else:
+        window = len(values)
+    is_sequential = values[:window] > max_generate_time
+    segment_length = len(is_sequential)
+    sequential_number = np.cumsum(is_sequential)
+    nonsequential_number = np.arange(1, segment_length + 1) - sequential_number
+    for number, room in [(sequential_number, sequential_room), (nonsequential_number, nonsequential_room)]:
+        if room > 0:
+            # the data point which makes the buffer full
+            full_index = int(np.searchsorted(number, room))
+            segment_length = min(segment_length, full_index + 1)
+    return segment_length, is_sequential[:segment_length]
+
+
+def split_merged_data(generate_times, write_times, size):
+    """
+    Split the merged data points into several sstables
+    :param generate_times: an array of generate times, ordered by generate time
+    :param write_times: an array of write times, corresponding to the generate times
+    :param size: the capacity of the output sstables
+    :return: a list of ColumnarSSTables, each of them is marked as generated from merge sort
+    """
+    result_list = []
+    for start in range(0, len(generate_times), size):
+        end = min(start + size, len(generate_times))
+        # copy the slices, otherwise every sstable keeps the whole merged arrays alive
+        result_list.append(ColumnarSSTable(generate_times[start:end].copy(), write_times[start:end].copy(),
+                                           generate_times[start], generate_times[end - 1], 0, True))
+    return result_list
+
+
+def bulk_merge_sort(sstables, size):
+    """
+    Merge ColumnarSSTables in bulk. The remaining data points of all sstables are concatenated and sorted by a single
+    stable sort, so that data points with equal generate time keep the order given by the k-way merge, that is, the
+    one in an earlier sstable of the input list goes first.
+    :param sstables: a list of ColumnarSSTables to be merged
+    :param size: the capacity of the output sstables
+    :return: a list of sstables, as a whole is a sorted structure of data points, ordered by the generate time
+    """
+    generate_times_list = []
+    write_times_list = []
+    for sstable in sstables:
+        generate_times, write_times = sstable.remaining()
+        generate_times_list.append(generate_times)
+        write_times_list.append(write_times)
+        # all the data points of the sstable are consumed by the merge
+        sstable.index = len(sstable)
+    generate_times = np.concatenate(generate_times_list)
+    order = np.argsort(generate_times, kind='stable')
+    # every data point is written once more
+    write_times = np.concatenate(write_times_list)[order] + 1
+    return split_merged_data(generate_times[order], write_times, size)
+
+
+def metrics_merge_sort(sstables, size):
+    """
+    Merge MetricsSSTables. Only the generate times are sorted to find the boundaries of the output sstables, the write
+    times of data points are not recorded.
+    :param sstables: a list of MetricsSSTables to be merged
+    :param size: the capacity of the output sstables
+    :return: a list of MetricsSSTables, as a whole is a sorted structure of data points, ordered by the generate time
+    """
+    generate_times_list = []
+    for sstable in sstables:
+        generate_times_list.append(sstable.remaining())
+        # all the data points of the sstable are consumed by the merge
+        sstable.index = len(sstable)
+    generate_times = np.sort(np.concatenate(generate_times_list))
+    result_list = []
+    for start in range(0, len(generate_times), size):
+        end = min(start + size, len(generate_times))
+        # copy the slice, otherwise every sstable keeps the whole merged array alive
+        result_list.append(MetricsSSTable(generate_times[start:end].copy(), generate_times[start],
+                                          generate_times[end - 1], 0, True))
+    return result_list
+
+
+def heap_merge_sort(sstables, size):
+    """
+    Merge ColumnarSSTables with a heap over the sstable runs. Instead of a single data point, each step copies the
+    longest run of the sstable with the minimal key that does not pass the minimal key of the other sstables, so an
+    sstable whose remaining range does not overlap any other is copied as a whole. Data points with equal generate
+    time are taken from the sstable with smaller index in the input list first, the same as the k-way merge.
+    :param sstables: a list of ColumnarSSTables to be merged
+    :param size: the capacity of the output sstables
+    :return: a list of sstables, as a whole is a sorted structure of data points, ordered by the generate time
+    """
+    # each element of the heap is <minimal key, index in the input list> of a non-empty sstable
+    heap = []
+    for i in range(len(sstables)):
+        if sstables[i].index < len(sstables[i]):
+            heap.append((sstables[i].peek(), i))
+    heapq.heapify(heap)
+
+    generate_times_list = []
+    write_times_list = []
+    while len(heap) > 0:
+        _, i = heapq.heappop(heap)
+        generate_times, write_times = sstables[i].remaining()
+        if len(heap) == 0:
+            # the last non-empty sstable, copy all its remaining data points
+            run_length = len(generate_times)
+        else:
+            next_key, next_i = heap[0]
+            # data points equal to the next minimal key go first only if this sstable comes first in the input list
+            run_length = np.searchsorted(generate_times, next_key, side='right' if i < next_i else 'left')
+        generate_times_list.append(generate_times[:run_length])
+        write_times_list.append(write_times[:run_length])
+        sstables[i].index += run_length
+        if sstables[i].index < len(sstables[i]):
+            heapq.heappush(heap, (sstables[i].peek(), i))
+
+    if len(generate_times_list) == 0:
+        return []
+    # every data point is written once more
+    return split_merged_data(np.concatenate(generate_times_list), np.concatenate(write_times_list) + 1, size)
+
+
+def merge_sort(sstables, size_=None, method='sort'):
     """
     Apply merge sort algorithm to
     :param sstables: a list of sstables to be merged
     :param size_: the capacity of the output sstables
+    :param method: how ColumnarSSTables are merged, 'sort' for a single stable sort over all data points, or 'heap'
+    for a heap-based merge over sstable runs. MetricsSSTables are always merged by sorting their generate times
     :return: a list of sstables, as a whole is a sorted structure of data points, ordered by the generate time
     """
     # if the output sstable size is not specified, we use the capacity of the first sstable in the input list to set
     # the capacity of the output sstable
-    size = len(sstables[0].data_list) if size_ is None else size_
+    size = len(sstables[0]) if size_ is None else size_
     # the output sstable list
     result_list = []
 
@@ -110,6 +396,15 @@ def merge_sort(sstables, size_=None):
         result_list.append(sstables[0])
         return result_list
 
+    if isinstance(sstables[0], MetricsSSTable):
+        # the write times of data points are not recorded, only the generate times are sorted
+        return metrics_merge_sort(sstables, size)
+    if isinstance(sstables[0], ColumnarSSTable):
+        # ColumnarSSTables are merged in bulk, instead of popping the data points one by one
+        if method == 'heap':
+            return heap_merge_sort(sstables, size)
+        return bulk_merge_sort(sstables, size)
+
     merged_data = []
     min_ = -1
     max_ = -1
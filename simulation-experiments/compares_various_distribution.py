@@ -1,8 +1,12 @@
-import multiprocessing
+import functools
 import sys
+import tempfile
 
 from algorithm_utils import *
 from lsm import LSM
+from result_store import ResultStore, sweep_columns, save_completed, pending_tasks
+from sweep import sweep
+from sweep_runner import shared_points, run_tasks, make_tasks, join_lsm_results
 from tlsm import tLSM
 
 np.random.seed(4834)
@@ -16,7 +20,26 @@ arg_statistic_number = 80
 arg_mu = 4
 arg_sigma = 1.5
 arg_sequential_buffer_increase_step = 5
-process_num = 191
+# number of sequential buffer sizes written in a task
+arg_sequential_buffer_sizes_per_task = 8
+# number of processes, the number of CPUs if it is None
+process_num = None
+# directory of the data points shared among the processes, e.g., '/dev/shm', the default temporary directory if
+# it is None
+arg_points_path = None
+# directory of the result store, the sweep resumes from the results stored in it
+arg_result_path = 'results_compares_various_distribution'
+# names of the statistic results of a tlsm structure, columns of the result store
+tlsm_result_names = ('tlsm_write_amplification_rate',
+                     'average_rewrite_data_point_number',
+                     'average_merge_sorted_files_number',
+                     'average_direct_flushed_files_number',
+                     'average_merge_sorted_points_number',
+                     'average_direct_flushed_points_number',
+                     'average_points_number_in_a_cycle',
+                     'average_g_function',
+                     'total_data_num',
+                     'total_write_num')
 
 
 def experiment(sequential_buffer_size, nonsequential_buffer_size, points, statistics_number):
@@ -29,11 +52,19 @@ def experiment(sequential_buffer_size, nonsequential_buffer_size, points, statis
     :return: statistic results
     """
     tlsm = tLSM(sequential_buffer_size, nonsequential_buffer_size,
-                sequential_buffer_size + nonsequential_buffer_size)
+                sequential_buffer_size + nonsequential_buffer_size, metrics_only=True)
 
-    for val in points:
-        tlsm.write(val)
+    tlsm.write_many(points)
+    return tlsm_statistics(tlsm, statistics_number)
 
+
+def tlsm_statistics(tlsm, statistics_number):
+    """
+    Collect the statistic results of a tlsm structure after writing the data points
+    :param tlsm: a tlsm structure
+    :param statistics_number: the number of observations in calculating statistics
+    :return: statistic results
+    """
     tlsm_write_amplification_rate = np.average(tlsm.history_write_amplification_rate[
                                                len(tlsm.history_write_amplification_rate) - statistics_number:])
 
@@ -127,119 +158,95 @@ def experiment(sequential_buffer_size, nonsequential_buffer_size, points, statis
            average_g_function, total_data_num, total_write_num
 
 
-def distribute_tasks(tasks, number):
-    """
-    Distribute the tasks into multiple groups
-    :param tasks: a list of tasks
-    :param number: number of groups
-    :return: a list of task groups
+def works(time_interval, mu, sigma, sequential_buffer_sizes, total_num, buffer_size, statistics_number, points_path):
     """
-    task_groups = []
-    for i in range(number):
-        task_groups.append([])
-    i = 0
-    for element in tasks:
-        task_groups[i % number].append(element)
-        i += 1
-    return task_groups
-
-
-def works(process_id, time_intervals, total_num, buffer_size, statistics_number,
-          seq_size_inc_rate, print_lock):
-    """
-    A worker corresponds to a process, which executes several tasks
-    :param process_id: id of the process
-    :param time_intervals: generate time
+    A task of the sweep, which is executed by any process of the pool
+    :param time_interval: generate time interval
+    :param mu: parameter of lognormal distribution, mu
+    :param sigma: parameter of lognormal distribution, sigma
+    :param sequential_buffer_sizes: a tuple of capacities of the sequential buffer, or None to write the LSM structure
     :param total_num: total number of data points to generate
     :param buffer_size: capacity of buffer for lsm
     :param statistics_number: the number of observations in calculating statistics
-    :param seq_size_inc_rate: the step of increase the capacity setting of sequential buffer
-    :param mu: parameter of lognormal distribution, mu
-    :param sigma: parameter of lognormal distribution, sigma
-    :param print_lock: process lock, for printing logs
+    :param points_path: directory of the data points shared among the processes
+    :return: the average sstable merge number of LSM if sequential_buffer_sizes is None, otherwise a list of statistic
+    results of tLSM, one for each sequential buffer size
     """
-    mus = [4, 4.5, 5]
-    sigmas = [1, 1.5, 2]
+    # data points, generated once and shared by all the tasks of this interval and distribution
+    data_points = shared_points(points_path, (time_interval, mu, sigma), generate_data_points,
+                                time_interval, total_num, mu, sigma)
+
+    if sequential_buffer_sizes is None:
+        # write LSM structure
+        lsm = LSM(buffer_size, buffer_size, statistics_number, metrics_only=True)
+        lsm.write_many(data_points)
+        # make sure the statistic number is valid
+        assert len(lsm.history_merge_sstable_number) * 0.6 - statistics_number > 0
+        return lsm.average_write_amplification_rate()
 
-    for mu in mus:
-        for sigma in sigmas:
-            counter = 0
-            for time_interval in time_intervals:
-                # generate data points
-                data_points = generate_data_points(time_interval, total_num, mu, sigma)
-
-                # write LSM structure
-                lsm = LSM(buffer_size, buffer_size, statistics_number)
-                for val in data_points:
-                    lsm.write(val)
-                # make sure the statistic number is valid
-                assert len(lsm.history_merge_sstable_number) * 0.6 - statistics_number > 0
-                lsm_average_write_amplification_rate = lsm.average_write_amplification_rate()
-                lsm_average_sstable_merge_number = lsm_average_write_amplification_rate
-
-                # with print_lock:
-                #     print('process_id=' + str(process_id),
-                #           'mu=' + str(mu),
-                #           'sigma=' + str(sigma),
-                #           'time_interval=' + str(time_interval),
-                #           'lsm_average_sstable_merge_number=' + str(lsm_average_sstable_merge_number))
-                #     sys.stdout.flush()
-
-                # write tLSM structure
-                for sequential_buffer_size in range(1, int(0.9 * buffer_size), seq_size_inc_rate):
-                    nonsequential_buffer_size = buffer_size - sequential_buffer_size
-                    tlsm_write_amplification_rate, \
-                    average_rewrite_data_point_number, \
-                    average_merge_sorted_files_number, \
-                    average_direct_flushed_files_number, \
-                    average_merge_sorted_points_number, \
-                    average_direct_flushed_points_number, \
-                    average_points_number_in_a_cycle, \
-                    average_g_function, total_data_num, total_write_num = experiment(sequential_buffer_size,
-                                                                                     nonsequential_buffer_size,
-                                                                                     data_points,
-                                                                                     statistics_number)
-
-                    ratio = float(lsm_average_sstable_merge_number / tlsm_write_amplification_rate)
-                    with print_lock:
-                        print('process_id=' + str(process_id),
-                              'mu=' + str(mu),
-                              'sigma=' + str(sigma),
-                              'time_interval=' + str(time_interval),
-                              'sequential_buffer_size=' + str(sequential_buffer_size),
-                              'lsm_average_sstable_merge_number=' + str(lsm_average_sstable_merge_number),
-                              'tlsm_write_amplification_rate=' + str(tlsm_write_amplification_rate),
-                              'rlsm/rtlsm=' + str(ratio),
-                              'average_rewrite_data_point_number=' + str(average_rewrite_data_point_number),
-                              'average_merge_sorted_files_number=' + str(average_merge_sorted_files_number),
-                              'average_direct_flushed_files_number=' + str(average_direct_flushed_files_number),
-                              'average_merge_sorted_points_number=' + str(average_merge_sorted_points_number),
-                              'average_direct_flushed_points_number=' + str(average_direct_flushed_points_number),
-                              'average_points_number_in_a_cycle=' + str(average_points_number_in_a_cycle),
-                              'average_g_function=' + str(average_g_function),
-                              'total_data_num=' + str(total_data_num),
-                              'total_write_num=' + str(total_write_num)
-                              )
-                        sys.stdout.flush()
-                counter += 1
+    # write tLSM structures with the sequential buffer sizes in a single pass over the data points
+    return sweep(data_points, buffer_size, sequential_buffer_sizes, tlsm_statistics, statistics_number,
+                 metrics_only=True)
 
 
 if __name__ == '__main__':
 
-    possible_intervals = range_float(arg_min_interval, arg_max_interval, arg_interval_step)
-    np.random.shuffle(possible_intervals)
-
-    intervals = distribute_tasks(possible_intervals, process_num)
-    lock = multiprocessing.Lock()
-    processes = []
-
-    # delays = Delay(2048).get_delays(arg_total_num)
-    for i in range(process_num):
-        process = multiprocessing.Process(target=works,
-                                          args=(i, intervals[i], arg_total_num, arg_buffer_size,
-                                                arg_statistic_number, arg_sequential_buffer_increase_step,
-                                                lock))
-        process.start()
-        processes.append(process)
-    for process in processes:
-        process.join()
+    possible_intervals = time_grid(arg_min_interval, arg_max_interval, arg_interval_step).tolist()
+    mus = [4, 4.5, 5]
+    sigmas = [1, 1.5, 2]
+    # tasks with smaller interval are slower, give them first
+    keys = [(time_interval, mu, sigma) for time_interval in possible_intervals for mu in mus for sigma in sigmas]
+    sequential_buffer_sizes = list(range(1, int(0.9 * arg_buffer_size), arg_sequential_buffer_increase_step))
+    tasks = make_tasks(keys, sequential_buffer_sizes, arg_sequential_buffer_sizes_per_task)
+    # removed when the sweep exits
+    points_directory = tempfile.TemporaryDirectory(dir=arg_points_path)
+    work = functools.partial(works, total_num=arg_total_num, buffer_size=arg_buffer_size,
+                             statistics_number=arg_statistic_number, points_path=points_directory.name)
+
+    # skip the tasks stored by a previous run, and store each task as soon as it completes
+    store = ResultStore(arg_result_path)
+    tasks, lsm_results = pending_tasks(store, tasks)
+    columns = functools.partial(sweep_columns, ('time_interval', 'mu', 'sigma'), tlsm_result_names)
+    completed = save_completed(store, run_tasks(work, tasks, process_num), columns)
+
+    for task, result, process_id, cost, lsm_average_sstable_merge_number in join_lsm_results(completed, lsm_results):
+        time_interval, mu, sigma, task_sequential_buffer_sizes = task
+        print('process_id=' + str(process_id),
+              'mu=' + str(mu),
+              'sigma=' + str(sigma),
+              'time_interval=' + str(time_interval),
+              'sequential_buffer_sizes=' + str(task_sequential_buffer_sizes),
+              'task_cost=' + str(cost))
+        if task_sequential_buffer_sizes is None:
+            continue
+
+        for sequential_buffer_size, sweep_result in zip(task_sequential_buffer_sizes, result):
+            tlsm_write_amplification_rate, \
+            average_rewrite_data_point_number, \
+            average_merge_sorted_files_number, \
+            average_direct_flushed_files_number, \
+            average_merge_sorted_points_number, \
+            average_direct_flushed_points_number, \
+            average_points_number_in_a_cycle, \
+            average_g_function, total_data_num, total_write_num = sweep_result
+
+            ratio = float(lsm_average_sstable_merge_number / tlsm_write_amplification_rate)
+            print('process_id=' + str(process_id),
+                  'mu=' + str(mu),
+                  'sigma=' + str(sigma),
+                  'time_interval=' + str(time_interval),
+                  'sequential_buffer_size=' + str(sequential_buffer_size),
+                  'lsm_average_sstable_merge_number=' + str(lsm_average_sstable_merge_number),
+                  'tlsm_write_amplification_rate=' + str(tlsm_write_amplification_rate),
+                  'rlsm/rtlsm=' + str(ratio),
+                  'average_rewrite_data_point_number=' + str(average_rewrite_data_point_number),
+                  'average_merge_sorted_files_number=' + str(average_merge_sorted_files_number),
+                  'average_direct_flushed_files_number=' + str(average_direct_flushed_files_number),
+                  'average_merge_sorted_points_number=' + str(average_merge_sorted_points_number),
+                  'average_direct_flushed_points_number=' + str(average_direct_flushed_points_number),
+                  'average_points_number_in_a_cycle=' + str(average_points_number_in_a_cycle),
+                  'average_g_function=' + str(average_g_function),
+                  'total_data_num=' + str(total_data_num),
+                  'total_write_num=' + str(total_write_num)
+                  )
+        sys.stdout.flush()
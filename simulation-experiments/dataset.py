@@ -0,0 +1,8 @@
+import os
+import sys
+
+# the binary data point format is defined once in data-generation/binary_points.py, and read_points memory-maps the
+# columns of a file, which can be written to the structures directly, e.g., tlsm.write_many(points['generate_time']) or
+# hybrid.write_many(points['generate_time'], points['delay'])
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data-generation'))
+from binary_points import BINARY_COLUMNS, read_points
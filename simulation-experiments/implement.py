@@ -1,95 +1,146 @@
-import math
-import matplotlib.pyplot as plt
 import numpy as np
-from queue import Queue
 
 from algorithm_utils import merge_sort, generate_data_points_with_delay, generate_data_points_real_delay, \
-    generate_data_points_real_delay_with_delay
+    generate_data_points_real_delay_with_delay, next_flush_segment
 from lsm import LSM
-from sstable import SSTable
+from level import Level
+from ring_buffer import RingBuffer
+from sstable import ColumnarSSTable
 
 
 def count_point(ssts):
     ret = 0
     for sst in ssts:
         assert sst.index == 0
-        ret += len(sst.data_list)
+        ret += len(sst)
     return ret
 
 
-class BufferedQueue:
+class DelayStatistics:
     """
-    A buffered queue. The size of the queue is fixed. Elements are constantly added to the queue.
-    When the queue is full, the oldest element is removed to make room for the new element.
+    Statistics on delays, a discrete CDF function which is updated with each observed delay
     """
 
-    def __init__(self, maxsize) -> None:
+    def __init__(self, bucket_width, bucket_num, window_size=None, decay=1.0) -> None:
         """
-        Constructor of a BufferedQueue
-        :param maxsize: maximal number of element the queue can hold
+        Describes the distribution of the observed delays by counting them in buckets of the same width, i.e., the
+        k-th bucket counts the delays in [(k - 1) * bucket_width, k * bucket_width). The negative delays are counted in
+        the 0-th bucket, and the delays not smaller than bucket_num * bucket_width in the last bucket.
+        :param bucket_width: width of a bucket, which is the resolution of the CDF function
+        :param bucket_num: number of buckets, which is related to the x axis of discrete CDF function
+        :param window_size: only the window_size latest delays are counted, which are held in a ring buffer, or all the
+        observed delays if it is None
+        :param decay: weight of a delay relative to the next observed one, i.e., the i-th latest delay is counted with
+        weight decay ** i, or 1.0 for counting all the delays equally
         """
         super().__init__()
-        self.queue = Queue(maxsize=maxsize)
-        self.element_sum = 0
-        self.element_number = 0
-
-    def put(self, val):
-        """
-        Add a element to the buffered queue
-        :param val: the element
-        """
-        if self.queue.full():
-            self.element_sum -= self.queue.get()
-        else:
-            self.element_number += 1
-        self.queue.put(val)
-        self.element_sum += val
-
-    def full(self):
-        return self.queue.full()
-
-    def average(self):
+        self.bucket_width = bucket_width
+        self.bucket_num = bucket_num
+        self.bucket_counts = np.zeros(bucket_num + 2, dtype=np.float64)
+        # number of observed delays, including the ones out of the window
+        self.delay_number = 0
+        # total weight of the delays in the window
+        self.weight_sum = 0.0
+        # cumulative bucket counts, computed when the CDF function is evaluated after an update
+        self.cumulative_counts = None
+
+        self.window = None if window_size is None else RingBuffer(window_size)
+        self.decay = decay
+        # the weights are not decayed one delay at a time, instead, the i-th observed delay is counted with weight
+        # decay ** (weight_origin - i), and all the weights are rescaled when they are about to overflow
+        self.weight_origin = 0
+
+    def __bucket_index(self, delays):
+        # round before taking the floor, so that a delay on the boundary of two buckets is not put in the lower one
+        # because of a rounding error, e.g., 3 * 0.05 / 0.05
+        index = np.floor(np.round(np.asarray(delays, dtype=np.float64) / self.bucket_width, 9)).astype(np.int64) + 1
+        return np.clip(index, 0, self.bucket_num + 1)
+
+    def __weights(self, first, number):
+        # weights of the delays observed from the first-th one
+        if self.decay == 1.0:
+            return np.ones(number)
+        return np.power(self.decay, self.weight_origin - first - np.arange(number, dtype=np.float64))
+
+    def __count(self, delays, first, sign):
+        # add the weights of the delays observed from the first-th one to the buckets, or subtract them if sign is -1
+        weights = sign * self.__weights(first, len(delays))
+        self.bucket_counts += np.bincount(self.__bucket_index(delays), weights=weights, minlength=self.bucket_num + 2)
+        self.weight_sum += weights.sum()
+
+    def __rescale(self, number):
+        # rescale the weights before the weights of the next number delays overflow, which does not change the CDF
+        # function, afterwards the weights of the next number delays are not larger than 1
+        if self.decay != 1.0 and (self.delay_number + number - self.weight_origin) * -np.log(self.decay) > 512:
+            scale = np.power(self.decay, self.delay_number + number - self.weight_origin)
+            self.bucket_counts *= scale
+            self.weight_sum *= scale
+            self.weight_origin = self.delay_number + number
+
+    def add(self, delay):
         """
-        Expected value of whatever in the buffered queue
-        :return: the expected value
+        Observe a delay
+        :param delay: the delay
         """
-        return float(self.element_sum) / self.element_number
-
+        self.update([delay])
 
-class DelayStatistics:
-    """
-    Statistics on delays
-    """
-
-    def __init__(self, delays, max_delay=None, bucket_num=None) -> None:
+    def update(self, delays):
         """
-        Describes the distribution of the observed delay list
-        :param delays: the delay list
-        :param max_delay: maximal delay, which is related to the x axis of discrete CDF function
-        :param bucket_num: bucket number of the discrete CDF function
+        Observe an array of delays, which is the same as observing them one by one
+        :param delays: the delays
         """
-        super().__init__()
-        self.delays = delays
-        self.max_delay = max_delay if max_delay is not None else max(delays)
-        self.bucket_num = bucket_num if bucket_num is not None else math.ceil(float(len(self.delays)) / 10)
-        self.f_value, self.x_bins, _ \
-            = plt.hist(self.delays, self.bucket_num, range=[0, self.max_delay], density=1, cumulative=True)
-        self.step = self.x_bins[1]
+        delays = np.asarray(delays, dtype=np.float64)
+        self.__rescale(len(delays))
+        self.__count(delays, self.delay_number, 1)
+        if self.window is not None:
+            # the delays out of the window, including the new delays if there are more of them than the window size,
+            # are the earliest observed ones
+            first_removed = self.delay_number - len(self.window)
+            removed = self.window.extend(delays)
+            self.__count(removed, first_removed, -1)
+        self.delay_number += len(delays)
+        self.cumulative_counts = None
 
     def F(self, val):
         """
         The discrete CDF function.
-        :param val: input delay
-        :return: the probability of delay being less than the input value
+        :param val: input delay, or an array of input delays
+        :return: the probability of delay being less than the input value, exact if the input value is a multiple of
+        bucket_width not larger than bucket_num * bucket_width
         """
-        return 1 if val >= self.max_delay else self.f_value[int(val / self.step)]
+        if self.cumulative_counts is None:
+            self.cumulative_counts = np.cumsum(self.bucket_counts)
+        # number of buckets below the input value
+        index = np.clip(self.__bucket_index(val), 1, self.bucket_num + 1) - 1
+        return self.cumulative_counts[index] / (self.weight_sum if self.weight_sum > 0 else 1)
 
 
 class Hybrid:
 
     def __init__(self, lsm_buffer_size, generate_time_interval, sstable_size=None, delay_buffer_size=2000,
-                 statistics_number=20, min_sequential_buffer_size=128, print_all_n1=False) -> None:
+                 statistics_number=20, min_sequential_buffer_size=128, print_all_n1=False, merge_method='sort',
+                 retune_cycles=None, retune_hysteresis=0.05, delay_window_size=None, delay_decay=1.0,
+                 prediction_error_threshold=None) -> None:
+        """
+        :param retune_cycles: after switching to tLSM, re-run the cost model every retune_cycles flushes of the
+        nonsequential buffer, or never if it is None
+        :param retune_hysteresis: the buffers are resized only if the predicted write amplification rate of the new
+        sequential buffer size is lower than that of the current one by more than this ratio
+        :param delay_window_size: the cost model only uses the delay_window_size latest delays, or all the observed
+        delays if it is None, see DelayStatistics
+        :param delay_decay: weight of a delay relative to the next observed one in the cost model, see DelayStatistics
+        :param prediction_error_threshold: after switching to tLSM, re-run the cost model when the relative error of
+        the predicted write amplification rate exceeds this threshold and twice the standard error of the observed
+        rate, see prediction_error, or never if it is None. Before re-running the cost model, the η of LSM is
+        calibrated by the write amplification observed since the last resize, see history_calibration. The error of
+        the mean over statistics_number cycles should be well below the threshold, otherwise the re-tuning is
+        triggered by chance. It can not be combined with retune_cycles smaller than statistics_number, because the
+        error is measured over statistics_number cycles after the cost model is run, which would never be reached
+        """
         super().__init__()
+        if prediction_error_threshold is not None and retune_cycles is not None and retune_cycles < statistics_number:
+            raise ValueError('prediction_error_threshold needs retune_cycles not smaller than statistics_number, but got '
+                             + str(retune_cycles) + ' < ' + str(statistics_number))
         self.print_all_n1 = print_all_n1
         self.total_write_times = 0
         self.generate_time_interval = generate_time_interval
@@ -106,17 +157,22 @@ class Hybrid:
         self.max_generate_time_on_level_1 = 0
 
         # LEVEL1, for storing sstables
-        self.level_1 = []
+        self.level_1 = Level()
         self.sstable_size = self.lsm_buffer_size if sstable_size is None else sstable_size
+        # how sstables are merge sorted, 'sort' or 'heap', see algorithm_utils.merge_sort
+        self.merge_method = merge_method
 
         # strategy
         self.use_tlsm = False
 
         # statistics
         self.delay_buffer_size = delay_buffer_size
-        self.lsm_eta_list = BufferedQueue(maxsize=statistics_number)
-        # self.tlsm_eta_list = BufferedQueue(maxsize=statistics_number)
-        self.delays = []
+        # the numbers of sstables merged in the statistics_number latest merges of LSM, before switching to tLSM
+        self.lsm_eta_list = RingBuffer(statistics_number)
+        # the CDF function of the delays, which is evaluated on multiples of the generate time interval up to the
+        # capacity of buffer C0, see __get_candidate_n1. The delays themselves are not kept, except the ones in the
+        # window, so the memory does not grow with the number of data points
+        self.delay_statistics = DelayStatistics(generate_time_interval, lsm_buffer_size, delay_window_size, delay_decay)
 
         self.statistics_number = statistics_number
 
@@ -124,58 +180,189 @@ class Hybrid:
 
         self.history_write_amplification_rate = []
 
+        # continuous re-tuning
+        self.retune_cycles = retune_cycles
+        self.retune_hysteresis = retune_hysteresis
+        # number of data points written
+        self.data_point_number = 0
+        # number of nonsequential buffer flushes since the last time the cost model was run
+        self.cycles_since_tuning = 0
+        # total write times and number of data points when the cost model was run last time
+        self.tuning_mark = (0, 0)
+        # the sequential buffer size to apply at the next flush, None if the buffers are not to be resized
+        self.pending_sequential_buffer_size = None
+        # a list of <number of data points, old sequential buffer size, new sequential buffer size, write amplification
+        # in the retune_cycles cycles before the change, write amplification in the retune_cycles cycles after>
+        self.history_retuning = []
+
+        # predicted vs. observed write amplification
+        self.prediction_error_threshold = prediction_error_threshold
+        # the write amplification rate predicted by the cost model for the current sequential buffer size
+        self.predicted_write_amplification = None
+        # the write amplification rates of the statistics_number latest cycles since the prediction, where a cycle ends
+        # with a flush of the nonsequential buffer
+        self.observed_write_amplification = RingBuffer(statistics_number)
+        # total write times and number of data points at the end of the last cycle
+        self.cycle_mark = (0, 0)
+        # the η of LSM which the observed write amplification of tLSM corresponds to, used by the cost model instead of
+        # the η measured before the switch once the prediction is found to be off, see __calibrate
+        self.calibrated_eta = None
+        # total write times and number of data points when the sequential buffer was resized last time
+        self.size_mark = (0, 0)
+        # a list of <number of data points, prediction error, calibrated η>
+        self.history_calibration = []
+
     def __to_use_tlsm(self):
-        return len(self.delays) >= self.statistics_number and self.lsm_eta_list.full()
+        return self.delay_statistics.delay_number >= self.statistics_number and self.lsm_eta_list.full()
 
-    def __get_candidate_n1(self):
-        delay_analysis = DelayStatistics(self.delays)
-        sum_list = [-1]
-        for i in range(1, self.lsm_buffer_size):
-            last = 0 if i == 1 else sum_list[len(sum_list) - 1]
-            sum_list.append(last + delay_analysis.F(i * self.generate_time_interval))
-
-        g_value_list = []
-        n1_list = []
-
-        expected_eta = self.lsm_eta_list.average()
-
-        for g_plus_n1 in range(self.min_sequential_buffer_size, self.lsm_buffer_size):
-            g_value = g_plus_n1 - sum_list[g_plus_n1]
-            n1_value = g_plus_n1 - g_value
-            g_value_list.append(g_value)
-            n1_list.append(n1_value)
-
-        print(n1_list)
-        print(g_value_list)
-        g_value_list = np.array(g_value_list)
-        n1_list = np.array(n1_list)
+    def __cost_model(self, expected_eta=None):
+        """
+        Predict the write amplification rate of tLSM with each candidate size of the sequential buffer
+        :param expected_eta: the η of LSM, the one measured before the switch or calibrated afterwards if it is None
+        :return: an array of candidate sizes of the sequential buffer, in increasing order, and an array of the
+        predicted write amplification rates
+        """
+        delay_analysis = self.delay_statistics
+        # sum_list[i] is the sum of F(j * generate_time_interval) for j in [1, i], evaluated on all the offsets at once
+        offsets = np.arange(1, self.lsm_buffer_size) * self.generate_time_interval
+        sum_list = np.concatenate(([-1], np.cumsum(delay_analysis.F(offsets))))
+
+        if expected_eta is None:
+            expected_eta = self.lsm_eta_list.mean() if self.calibrated_eta is None else self.calibrated_eta
+
+        g_plus_n1 = np.arange(self.min_sequential_buffer_size, self.lsm_buffer_size)
+        n1_list = sum_list[g_plus_n1]
+        g_value_list = g_plus_n1 - n1_list
         n2_list = self.lsm_buffer_size - n1_list
-        # print(n1_list)
         tmp = n1_list * n2_list / g_value_list
-        # print('temp', tmp)
         r_tlsm = 2 + (expected_eta * self.lsm_buffer_size) / (tmp + n2_list)
 
         if self.print_all_n1:
-            print(','.join(n1_list))
-            print(','.join(r_tlsm))
-        # print('rtlsm', r_tlsm)
-        min_rate = np.min(r_tlsm)
+            print(','.join(map(str, n1_list.tolist())))
+            print(','.join(map(str, g_value_list.tolist())))
+            print(','.join(map(str, r_tlsm.tolist())))
+        return n1_list, r_tlsm
+
+    def __get_candidate_n1(self):
+        n1_list, r_tlsm = self.__cost_model()
         min_rate_index = np.argmin(r_tlsm)
+        self.__set_prediction(r_tlsm[min_rate_index])
         return np.round(n1_list[min_rate_index])
 
+    def __keeps_tuning(self):
+        # the cost model may be re-run after switching to tLSM, which needs up-to-date statistics on delays
+        return self.retune_cycles is not None or self.prediction_error_threshold is not None
+
+    def __set_prediction(self, write_amplification):
+        """
+        Record the write amplification rate predicted by the cost model, the cycles before are not compared with it
+        :param write_amplification: the predicted write amplification rate
+        """
+        self.predicted_write_amplification = float(write_amplification)
+        self.observed_write_amplification = RingBuffer(self.statistics_number)
+
+    def __observe_cycle(self):
+        """
+        Measure the write amplification of the cycle ending with the current flush of the nonsequential buffer
+        """
+        total_write_times, data_point_number = self.cycle_mark
+        self.cycle_mark = (self.total_write_times, self.data_point_number)
+        if self.data_point_number > data_point_number:
+            self.observed_write_amplification.append(
+                float(self.total_write_times - total_write_times) / (self.data_point_number - data_point_number))
+
+    def prediction_error(self):
+        """
+        Relative error of the write amplification rate predicted by the cost model
+        :return: (observed - predicted) / predicted, where observed is the mean write amplification rate of the cycles
+        since the prediction, up to statistics_number latest ones, or None if no cycle is observed yet
+        """
+        if self.predicted_write_amplification is None or len(self.observed_write_amplification) == 0:
+            return None
+        return (self.observed_write_amplification.mean() - self.predicted_write_amplification) / \
+            self.predicted_write_amplification
+
+    def __is_mispredicted(self):
+        # wait for statistics_number cycles, so that a single cycle with many merges does not trigger re-tuning, and
+        # ignore an error within the noise of the observed rates
+        if self.prediction_error_threshold is None or not self.observed_write_amplification.full():
+            return False
+        observed = self.observed_write_amplification
+        standard_error = np.sqrt(observed.variance() / len(observed))
+        return abs(self.prediction_error()) > self.prediction_error_threshold and \
+            abs(observed.mean() - self.predicted_write_amplification) > 2 * standard_error
+
+    def __calibrate(self):
+        """
+        Estimate the η of LSM with which the cost model predicts the write amplification rate observed since the last
+        resize for the current sequential buffer size. The predicted rate is 2 plus a term proportional to η, so the
+        sequential buffer size with the lowest predicted rate does not change, only the predicted rate does.
+        """
+        n1_list, r_tlsm = self.__cost_model(expected_eta=1)
+        rate_per_eta = np.interp(self.sequential_buffer_size, n1_list, r_tlsm) - 2
+        total_write_times, data_point_number = self.size_mark
+        observed = float(self.total_write_times - total_write_times) / max(self.data_point_number - data_point_number, 1)
+        self.calibrated_eta = max(observed - 2, 0) / rate_per_eta
+        self.history_calibration.append([self.data_point_number, self.prediction_error(), self.calibrated_eta])
+        print('calibrated eta=', self.calibrated_eta)
+
+    def __recent_write_amplification(self):
+        """
+        Write amplification since the cost model was run last time, and start measuring the next period
+        :return: total write times divided by number of data points written in the period
+        """
+        total_write_times, data_point_number = self.tuning_mark
+        self.tuning_mark = (self.total_write_times, self.data_point_number)
+        return float(self.total_write_times - total_write_times) / max(self.data_point_number - data_point_number, 1)
+
+    def __retune(self):
+        """
+        Re-run the cost model with the recent statistics. The buffers are resized at the next flush, if the predicted
+        write amplification rate improves by more than retune_hysteresis.
+        """
+        self.cycles_since_tuning = 0
+        write_amplification = self.__recent_write_amplification()
+        if len(self.history_retuning) > 0 and self.history_retuning[-1][4] is None:
+            # the period after the last change
+            self.history_retuning[-1][4] = write_amplification
+            print('write amplification after retuning=', write_amplification)
+        n1_list, r_tlsm = self.__cost_model()
+        min_rate_index = np.argmin(r_tlsm)
+        candidate_n1 = np.round(n1_list[min_rate_index])
+        current_rate = np.interp(self.sequential_buffer_size, n1_list, r_tlsm)
+        if candidate_n1 != self.sequential_buffer_size and \
+                r_tlsm[min_rate_index] < (1 - self.retune_hysteresis) * current_rate:
+            self.pending_sequential_buffer_size = candidate_n1
+            self.__set_prediction(r_tlsm[min_rate_index])
+            self.history_retuning.append(
+                [self.data_point_number, self.sequential_buffer_size, candidate_n1, write_amplification, None])
+            print('retune tlsm, seq buffer=', self.sequential_buffer_size, '->', candidate_n1,
+                  'write amplification before=', write_amplification)
+        else:
+            # the prediction for the current size with the recent statistics
+            self.__set_prediction(current_rate)
+
+    def __apply_pending_resize(self):
+        """
+        Resize the buffers at a flush boundary, if the cost model asked for it. A buffer holding no less data points than
+        its new capacity is flushed.
+        """
+        if self.pending_sequential_buffer_size is None:
+            return
+        self.__set_sequential_buffer_size(self.pending_sequential_buffer_size)
+        self.size_mark = (self.total_write_times, self.data_point_number)
+        self.pending_sequential_buffer_size = None
+        if len(self.sequential_buffer) >= self.sequential_buffer_size:
+            self.__write_sequential_buffer()
+        if len(self.nonsequential_buffer) >= self.nonsequential_buffer_size:
+            self.__write_nonsequential_buffer()
+
     def __write_lsm_buffer(self):
         if len(self.lsm_buffer) > 0:
-            # retrieve the content in buffer
-            data_point_list = self.lsm_buffer.copy()
-            # sort the data points by generate time
-            data_point_list.sort()
-            # a list of <generate_time, write_times> pairs
-            pairs = []
-            for i in data_point_list:
-                # for each data points, form a pair <generate_time, write_times>, write_times is initialize as 0
-                pairs.append([i, 0])
-            # form an sstable
-            sst = SSTable(pairs, data_point_list[0], data_point_list[len(data_point_list) - 1], False)
+            # retrieve the content in buffer, and sort the data points by generate time
+            data_points = np.sort(np.array(self.lsm_buffer, dtype=np.float64))
+            # form an sstable, the write times of each data point is initialized as 0
+            sst = ColumnarSSTable(data_points, 0, data_points[0], data_points[-1], 0)
             self.__merge(sst)
             self.lsm_buffer.clear()
 
@@ -185,21 +372,14 @@ class Hybrid:
         :param new_sstable: a new sstable
         """
         # record the sstables need to participate in merge sort
-        merge_list = []
-        # iterate the sstables in LEVEL1 from tail (with later generate time) to head (with earlier generate time)
-        # to check whether it has overlapped generate time range with the new sstable
-        while len(self.level_1) > 0:
-            last_sstable = self.level_1.pop()
-            if last_sstable.max_val > new_sstable.min_val:
-                # overlapped generate time range exists, remove it from LEVEL1 and append the sstable to the list
-                merge_list.append(last_sstable)
-            else:
-                # current sstable has no overlap generate time range with the new sstable
-                # put it back to the tail of LEVEL1
-                self.level_1.append(last_sstable)
-                break
-        # record the number of sstables in LEVEL1 to merge
-        self.lsm_eta_list.put(len(merge_list))
+        # the sstables on LEVEL1 which have overlapped generate time range with the new sstable are found by binary
+        # search, and removed from LEVEL1 in one slice, ordered from tail (with later generate time) to head (with
+        # earlier generate time)
+        merge_list = self.level_1.pop_overlapped(new_sstable.min_val)
+        if not self.use_tlsm:
+            # record the number of sstables in LEVEL1 to merge, which is the η of LSM expected by the cost model. The
+            # merges of the nonsequential buffer of tLSM are not counted, so η is kept as measured before the switch
+            self.lsm_eta_list.append(len(merge_list))
         # record the write amplification history
         self.history_write_amplification_rate.append(len(merge_list))
 
@@ -208,14 +388,14 @@ class Hybrid:
             # Because it simulate that the data points is written to the disk, we increase the write times of
             # each data points by one
             new_sstable.rewrite()
-            self.total_write_times += len(new_sstable.data_list)
+            self.total_write_times += len(new_sstable)
             self.level_1.append(new_sstable)
         else:
             # append the new sstable to the merge list, apply merge sort generate several sstables, and append
             # the at the end of LEVEL1
             merge_list.append(new_sstable)
             self.total_write_times += count_point(merge_list)
-            self.level_1.extend(merge_sort(merge_list, self.sstable_size))
+            self.level_1.extend(merge_sort(merge_list, self.sstable_size, self.merge_method))
 
     def __write_lsm(self, val):
         # append the value to the buffer C0
@@ -237,19 +417,15 @@ class Hybrid:
         Write the content inside sequential buffer to LEVEL1, and finally clear the sequential buffer
         """
         if len(self.sequential_buffer) > 0:
-            data_point_list = self.sequential_buffer.copy()
-            data_point_list.sort()
-            pairs = []
-            for i in data_point_list:
-                # Because the sstable is directly write to LEVEL1, the write number of each data point is initialized
-                # as 1
-                pairs.append([i, 1])
-            sstable = SSTable(pairs, data_point_list[0], data_point_list[len(data_point_list) - 1], 0, False)
-            self.max_generate_time_on_level_1 = data_point_list[len(data_point_list) - 1]
+            data_points = np.sort(np.array(self.sequential_buffer, dtype=np.float64))
+            # Because the sstable is directly write to LEVEL1, the write number of each data point is initialized as 1
+            sstable = ColumnarSSTable(data_points, 1, data_points[0], data_points[-1], 0, False)
+            self.max_generate_time_on_level_1 = data_points[-1]
             # append the new sstable to the tail of LEVEL1 directly, without merge
-            self.total_write_times += len(sstable.data_list)
+            self.total_write_times += len(sstable)
             self.level_1.append(sstable)
             self.sequential_buffer.clear()
+            self.__apply_pending_resize()
 
     def __write_nonsequential_buffer(self):
         """
@@ -257,16 +433,24 @@ class Hybrid:
         """
         if len(self.nonsequential_buffer) > 0:
             # retrieve the content inside nonsequential buffer
-            data_point_list = self.nonsequential_buffer.copy()
-            data_point_list.sort()
-            pairs = []
-            for i in data_point_list:
-                pairs.append([i, 0])
+            data_points = np.sort(np.array(self.nonsequential_buffer, dtype=np.float64))
             # form a new sstable
-            sstable = SSTable(pairs, data_point_list[0], data_point_list[len(data_point_list) - 1], 0)
+            sstable = ColumnarSSTable(data_points, 0, data_points[0], data_points[-1], 0)
             # merge the new sstable to LEVEL1
             self.__merge(sstable)
             self.nonsequential_buffer.clear()
+            if self.use_tlsm:
+                self.__observe_cycle()
+                if self.retune_cycles is not None:
+                    self.cycles_since_tuning += 1
+                    if self.cycles_since_tuning >= self.retune_cycles:
+                        self.__retune()
+                if self.__is_mispredicted():
+                    print('prediction error=', self.prediction_error(), 'predicted write amplification=',
+                          self.predicted_write_amplification)
+                    self.__calibrate()
+                    self.__retune()
+            self.__apply_pending_resize()
 
     def __write_tlsm(self, val):
         if self.print_all_n1:
@@ -280,23 +464,93 @@ class Hybrid:
             if len(self.nonsequential_buffer) == self.nonsequential_buffer_size:
                 self.__write_nonsequential_buffer()
 
+    def __write_lsm_many(self, values):
+        start = 0
+        while start < len(values):
+            # fill the buffer C0 with a chunk of values, and form an sstable if the buffer is full
+            end = min(start + self.lsm_buffer_size - len(self.lsm_buffer), len(values))
+            self.lsm_buffer.extend(values[start:end].tolist())
+            start = end
+            if len(self.lsm_buffer) == self.lsm_buffer_size:
+                self.__write_lsm_buffer()
+
+    def __write_tlsm_many(self, values, delays):
+        if self.print_all_n1 and len(values) > 0:
+            exit(0)
+        start = 0
+        while start < len(values):
+            # split the data points until one of the buffers is full
+            segment_length, is_sequential = next_flush_segment(
+                values[start:], self.max_generate_time_on_level_1,
+                int(self.sequential_buffer_size) - len(self.sequential_buffer),
+                int(self.nonsequential_buffer_size) - len(self.nonsequential_buffer))
+            segment = values[start:start + segment_length]
+            if self.__keeps_tuning():
+                # keep the statistics on delays up to date for re-tuning
+                self.delay_statistics.update(delays[start:start + segment_length])
+            self.data_point_number += segment_length
+            start += segment_length
+            self.sequential_buffer.extend(segment[is_sequential].tolist())
+            self.nonsequential_buffer.extend(segment[~is_sequential].tolist())
+            if len(self.sequential_buffer) == self.sequential_buffer_size:
+                self.__write_sequential_buffer()
+            if len(self.nonsequential_buffer) == self.nonsequential_buffer_size:
+                self.__write_nonsequential_buffer()
+
     def __set_sequential_buffer_size(self, size):
         self.sequential_buffer_size = size
         self.nonsequential_buffer_size = self.lsm_buffer_size - size
 
+    def __switch_to_tlsm(self):
+        self.__write_lsm_buffer()
+        self.__set_sequential_buffer_size(self.__get_candidate_n1())
+        self.max_generate_time_on_level_1 = self.level_1[len(self.level_1) - 1].max_val
+        self.use_tlsm = True
+        self.tuning_mark = (self.total_write_times, self.data_point_number)
+        self.cycle_mark = self.tuning_mark
+        self.size_mark = self.tuning_mark
+        print('use tlsm, seq buffer=', self.sequential_buffer_size)
+
     def write(self, val, delay):
         if self.use_tlsm is False:
             if self.__to_use_tlsm():
-                self.__write_lsm_buffer()
-                self.__set_sequential_buffer_size(self.__get_candidate_n1())
-                self.max_generate_time_on_level_1 = self.level_1[len(self.level_1) - 1].max_val
-                self.use_tlsm = True
-                print('use tlsm, seq buffer=', self.sequential_buffer_size)
+                self.__switch_to_tlsm()
             else:
-                self.delays.append(delay)
+                self.delay_statistics.add(delay)
                 self.use_tlsm = False
+        if self.use_tlsm and self.__keeps_tuning():
+            # keep the statistics on delays up to date for re-tuning
+            self.delay_statistics.add(delay)
+        # counted after switching to tLSM, so that the marks taken at the switch do not include it, as in write_many
+        self.data_point_number += 1
         self.__write_lsm(val) if not self.use_tlsm else self.__write_tlsm(val)
 
+    def write_many(self, values, delays):
+        """
+        Write a batch of data points to the Hybrid structure, which is the same as writing them one by one
+        :param values: an array of generate times of the data points, in arrival order
+        :param delays: an array of delays of the data points
+        """
+        values = np.asarray(values, dtype=np.float64)
+        delays = np.asarray(delays)
+        start = 0
+        while start < len(values) and self.use_tlsm is False:
+            if self.__to_use_tlsm():
+                self.__switch_to_tlsm()
+                break
+            if self.lsm_eta_list.full():
+                # only more delays are needed to switch to tLSM
+                end = start + self.statistics_number - self.delay_statistics.delay_number
+            else:
+                # the statistics on merges only change when the buffer C0 is flushed
+                end = start + self.lsm_buffer_size - len(self.lsm_buffer)
+            end = min(end, len(values))
+            self.delay_statistics.update(delays[start:end])
+            self.data_point_number += end - start
+            self.__write_lsm_many(values[start:end])
+            start = end
+        self.__write_tlsm_many(values[start:], delays[start:])
+
 
 if __name__ == '__main__':
     arg_time_interval = 50
@@ -313,10 +567,11 @@ if __name__ == '__main__':
     counter = 0
     s11_ = 0
     s22_ = 0
-    for point in data_points:
-        hybrid.write(point[0], point[2])
-        lsm.write(point[0])
-        counter += 1
+    for start in range(0, len(data_points), arg_buffer_size):
+        chunk = data_points[start:start + arg_buffer_size]
+        hybrid.write_many(chunk[:, 0], chunk[:, 2])
+        lsm.write_many(chunk[:, 0])
+        counter += len(chunk)
 
         if counter % arg_buffer_size == 0:
             # s1 = 0
@@ -324,8 +579,8 @@ if __name__ == '__main__':
             #     s1 += sst.get_write_times()
             s11 = hybrid.total_write_times
 
-            collected_delay = len(hybrid.delays)
-            collected_eta = hybrid.lsm_eta_list.element_number
+            collected_delay = hybrid.delay_statistics.delay_number
+            collected_eta = len(hybrid.lsm_eta_list)
 
             # s2 = 0
             # for sst in lsm.level_1:
@@ -0,0 +1,100 @@
+from bisect import bisect_left, bisect_right
+
+
+class Level:
+    """
+    A level of sstables, e.g., LEVEL1. The sstables are ordered by generate time and do not overlap with each other, so
+    their maximal keys are ordered too. The maximal keys are kept in a list, so that the sstables overlapping with a
+    new sstable can be found by binary search instead of checking them one by one from the tail.
+    """
+
+    def __init__(self) -> None:
+        """
+        Construct an empty level
+        """
+        super().__init__()
+        self.sstables = []
+        # the minimal and maximal key of each sstable, in the same order as self.sstables
+        self.min_values = []
+        self.max_values = []
+
+    def __len__(self):
+        return len(self.sstables)
+
+    def __iter__(self):
+        return iter(self.sstables)
+
+    def __getitem__(self, index):
+        return self.sstables[index]
+
+    def __repr__(self):
+        return repr(self.sstables)
+
+    def append(self, sstable):
+        """
+        Append an sstable to the tail of the level
+        :param sstable: an sstable whose keys are not less than the maximal key of the level
+        """
+        self.sstables.append(sstable)
+        self.min_values.append(sstable.min_val)
+        self.max_values.append(sstable.max_val)
+
+    def extend(self, sstables):
+        """
+        Append several sstables to the tail of the level
+        :param sstables: a list of sstables, ordered by generate time
+        """
+        for sstable in sstables:
+            self.append(sstable)
+
+    def pop_overlapped(self, min_val):
+        """
+        Remove the sstables whose maximal key is larger than the given key from the tail of the level
+        :param min_val: the minimal key of a new sstable
+        :return: a list of the removed sstables, ordered from the tail to the head of the level
+        """
+        start = bisect_right(self.max_values, min_val)
+        overlapped = self.sstables[start:]
+        del self.sstables[start:]
+        del self.min_values[start:]
+        del self.max_values[start:]
+        overlapped.reverse()
+        return overlapped
+
+    def pop_range(self, min_val, max_val):
+        """
+        Remove the sstables overlapping with a range of keys, which are consecutive in the level
+        :param min_val: the minimal key of the range
+        :param max_val: the maximal key of the range
+        :return: the position of the removed sstables, and a list of them, ordered from the head to the tail of the level
+        """
+        start = bisect_left(self.max_values, min_val)
+        end = max(bisect_right(self.min_values, max_val), start)
+        overlapped = self.sstables[start:end]
+        del self.sstables[start:end]
+        del self.min_values[start:end]
+        del self.max_values[start:end]
+        return start, overlapped
+
+    def pop_head(self, number):
+        """
+        Remove the sstables with the earliest generate time from the head of the level
+        :param number: number of sstables to remove
+        :return: a list of the removed sstables, ordered from the head to the tail of the level
+        """
+        head = self.sstables[:number]
+        del self.sstables[:number]
+        del self.min_values[:number]
+        del self.max_values[:number]
+        return head
+
+    def insert(self, index, sstables):
+        """
+        Insert several sstables at a position of the level
+        :param index: the position, the sstables before it have smaller keys than the inserted sstables, and the
+        sstables after it have larger keys
+        :param sstables: a list of sstables, ordered by generate time
+        """
+        self.sstables[index:index] = sstables
+        self.min_values[index:index] = [sstable.min_val for sstable in sstables]
+        self.max_values[index:index] = [sstable.max_val for sstable in sstables]
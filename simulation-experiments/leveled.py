@@ -0,0 +1,308 @@
+import numpy as np
+
+from algorithm_utils import merge_sort, next_flush_segment, generate_data_points_with_delay
+from level import Level
+from sstable import form_sstable
+
+
+def count_point(ssts):
+    ret = 0
+    for sst in ssts:
+        assert sst.index == 0
+        ret += len(sst)
+    return ret
+
+
+def per_level(value, level_number):
+    """
+    Expand a per-level parameter
+    :param value: a number shared by all the levels, or a list of numbers, one for each level
+    :param level_number: number of levels
+    :return: a list of level_number numbers
+    """
+    if np.isscalar(value) or value is None:
+        return [value] * level_number
+    if len(value) != level_number:
+        raise ValueError('expect ' + str(level_number) + ' values, one for each level, but got ' + str(len(value)))
+    return list(value)
+
+
+class PlainPolicy:
+    """
+    The policy of LSM: data points are written to the buffer C0, which is merged to LEVEL1 when it is full
+    """
+
+    def __init__(self, buffer_size=8) -> None:
+        """
+        :param buffer_size: the capacity of component in memory, that is C0
+        """
+        super().__init__()
+        self.buffer_size = buffer_size
+        self.buffer = []
+
+    def write(self, engine, val):
+        # append the value to the buffer C0
+        self.buffer.append(val)
+        # if the buffer C0 is full, form an sstable and write it to the LEVEL1
+        if len(self.buffer) == self.buffer_size:
+            self.flush(engine)
+
+    def write_many(self, engine, values):
+        start = 0
+        while start < len(values):
+            # fill the buffer C0 with a chunk of values, and form an sstable if the buffer is full
+            end = min(start + self.buffer_size - len(self.buffer), len(values))
+            self.buffer.extend(values[start:end].tolist())
+            start = end
+            if len(self.buffer) == self.buffer_size:
+                self.flush(engine)
+
+    def flush(self, engine):
+        if len(self.buffer) > 0:
+            # the write times of each data point is initialized as 0
+            engine.merge_to_level_1(form_sstable(np.sort(np.array(self.buffer, dtype=np.float64)), 0,
+                                                 engine.metrics_only))
+            self.buffer.clear()
+
+
+class SeparatedPolicy:
+    """
+    The policy of tLSM: sequential data points are written to the sequential buffer, which is appended to LEVEL1 when it
+    is full, and nonsequential data points are written to the nonsequential buffer, which is merged to LEVEL1
+    """
+
+    def __init__(self, sequential_buffer_size=8, nonsequential_buffer_size=8) -> None:
+        """
+        :param sequential_buffer_size: capacity of sequential buffer in memory
+        :param nonsequential_buffer_size: capacity of non-sequential buffer in memory
+        """
+        super().__init__()
+        self.sequential_buffer = []
+        self.nonsequential_buffer = []
+        self.sequential_buffer_size = sequential_buffer_size
+        self.nonsequential_buffer_size = nonsequential_buffer_size
+        self.max_generate_time_on_level_1 = 0
+
+    def write(self, engine, val):
+        if val > self.max_generate_time_on_level_1:
+            self.sequential_buffer.append(val)
+            if len(self.sequential_buffer) == self.sequential_buffer_size:
+                self.__write_sequential_buffer(engine)
+        else:
+            self.nonsequential_buffer.append(val)
+            if len(self.nonsequential_buffer) == self.nonsequential_buffer_size:
+                self.__write_nonsequential_buffer(engine)
+
+    def write_many(self, engine, values):
+        start = 0
+        while start < len(values):
+            # split the data points until one of the buffers is full
+            segment_length, is_sequential = next_flush_segment(
+                values[start:], self.max_generate_time_on_level_1,
+                self.sequential_buffer_size - len(self.sequential_buffer),
+                self.nonsequential_buffer_size - len(self.nonsequential_buffer))
+            segment = values[start:start + segment_length]
+            start += segment_length
+            self.sequential_buffer.extend(segment[is_sequential].tolist())
+            self.nonsequential_buffer.extend(segment[~is_sequential].tolist())
+            if len(self.sequential_buffer) == self.sequential_buffer_size:
+                self.__write_sequential_buffer(engine)
+            if len(self.nonsequential_buffer) == self.nonsequential_buffer_size:
+                self.__write_nonsequential_buffer(engine)
+
+    def __write_sequential_buffer(self, engine):
+        if len(self.sequential_buffer) > 0:
+            data_points = np.sort(np.array(self.sequential_buffer, dtype=np.float64))
+            # Because the sstable is directly write to LEVEL1, the write number of each data point is initialized as 1
+            self.max_generate_time_on_level_1 = data_points[-1]
+            engine.append_to_level_1(form_sstable(data_points, 1, engine.metrics_only))
+            self.sequential_buffer.clear()
+
+    def __write_nonsequential_buffer(self, engine):
+        if len(self.nonsequential_buffer) > 0:
+            engine.merge_to_level_1(form_sstable(np.sort(np.array(self.nonsequential_buffer, dtype=np.float64)), 0,
+                                                 engine.metrics_only))
+            self.nonsequential_buffer.clear()
+
+    def flush(self, engine):
+        self.__write_sequential_buffer(engine)
+        self.__write_nonsequential_buffer(engine)
+
+
+class LeveledLSM:
+    def __init__(self, policy, level_number=10, sstable_size=8, size_ratios=2, max_sstable_numbers=6,
+                 merge_method='sort', metrics_only=False) -> None:
+        """
+        Initialize an N-level leveled LSM structure. The buffers in memory are managed by the policy, and flushed to
+        LEVEL1. When a level holds more sstables than its maximal sstable number, its sstables with the earliest
+        generate time are merged to the next level, together with the sstables overlapping with them there. Each level
+        is a list of sstables ordered by generate time, while the levels may overlap with each other. The defaults
+        follow the level compaction of IoTDB, i.e., max_level_num=10, file_size_rate=2 and
+        seq_file_num_in_each_level=6.
+        :param policy: how data points are buffered and flushed to LEVEL1, PlainPolicy for LSM, or SeparatedPolicy for
+        tLSM
+        :param level_number: number of levels on disk, LEVEL1 to LEVEL<level_number>
+        :param sstable_size: capacity of sstables on LEVEL1
+        :param size_ratios: the capacity of sstables on LEVEL<i + 1> is size_ratios[i - 1] times that on LEVEL<i>, a
+        number shared by all the levels, or a list of level_number - 1 numbers
+        :param max_sstable_numbers: the compaction trigger of each level, LEVEL<i> is merged to the next level when it
+        holds more than max_sstable_numbers[i - 1] sstables, a number shared by all the levels, or a list of
+        level_number - 1 numbers, the last level is never merged
+        :param merge_method: how sstables are merge sorted, 'sort' or 'heap', see algorithm_utils.merge_sort
+        :param metrics_only: if set, sstables do not record the write times of data points, only the statistics and
+        total_write_times are collected
+        """
+        super().__init__()
+        self.policy = policy
+        self.levels = [Level() for _ in range(level_number)]
+        self.sstable_sizes = [sstable_size]
+        for size_ratio in per_level(size_ratios, level_number - 1):
+            self.sstable_sizes.append(int(self.sstable_sizes[-1] * size_ratio))
+        self.max_sstable_numbers = per_level(max_sstable_numbers, level_number - 1)
+        self.merge_method = merge_method
+        self.metrics_only = metrics_only
+
+        # number of data points written
+        self.data_point_number = 0
+        self.total_write_times = 0
+        # the write times of data points written to each level, by flushes, merges and compactions
+        self.level_write_times = [0] * level_number
+        # number of compactions from each level to the next one
+        self.compaction_numbers = [0] * level_number
+
+    def write(self, val):
+        """
+        Write a data point to the structure
+        :param val: generate time of the data point
+        """
+        self.data_point_number += 1
+        self.policy.write(self, val)
+
+    def write_many(self, values):
+        """
+        Write a batch of data points to the structure, which is the same as writing them one by one
+        :param values: an array of generate times of the data points, in arrival order
+        """
+        values = np.asarray(values, dtype=np.float64)
+        self.data_point_number += len(values)
+        self.policy.write_many(self, values)
+
+    def flush(self):
+        """
+        Flush whatever inside the buffers to LEVEL1
+        """
+        self.policy.flush(self)
+
+    def __count_writes(self, level_index, write_times):
+        self.level_write_times[level_index] += write_times
+        self.total_write_times += write_times
+
+    def append_to_level_1(self, new_sstable):
+        """
+        Append a new sstable to the tail of LEVEL1 directly, without merge
+        :param new_sstable: a new sstable, whose data points are later than all the data points on LEVEL1
+        """
+        self.__count_writes(0, len(new_sstable))
+        self.levels[0].append(new_sstable)
+        self.__compact()
+
+    def merge_to_level_1(self, new_sstable):
+        """
+        Merge a new sstable to LEVEL1, the same as the 2-level LSM and tLSM
+        :param new_sstable: a new sstable
+        """
+        # the sstables on LEVEL1 which have overlapped generate time range with the new sstable
+        merge_list = self.levels[0].pop_overlapped(new_sstable.min_val)
+        if len(merge_list) == 0:
+            # the new sstable is written to the disk as it is
+            new_sstable.rewrite()
+            self.__count_writes(0, len(new_sstable))
+            self.levels[0].append(new_sstable)
+        else:
+            merge_list.append(new_sstable)
+            self.__count_writes(0, count_point(merge_list))
+            self.levels[0].extend(merge_sort(merge_list, self.sstable_sizes[0], self.merge_method))
+        self.__compact()
+
+    def __compact(self):
+        """
+        Merge the levels holding too many sstables to the next levels, from LEVEL1 to the last level
+        """
+        for i in range(len(self.levels) - 1):
+            while len(self.levels[i]) > self.max_sstable_numbers[i]:
+                self.__compact_level(i)
+
+    def __compact_level(self, level_index):
+        """
+        Merge the sstables with the earliest generate time on a level to the next level, as many as fit in an sstable
+        of the next level
+        :param level_index: index of the level, 0 for LEVEL1
+        """
+        level, next_level = self.levels[level_index], self.levels[level_index + 1]
+        next_sstable_size = self.sstable_sizes[level_index + 1]
+        sstable_number = 1
+        point_number = len(level[0])
+        while sstable_number < len(level) and point_number + len(level[sstable_number]) <= next_sstable_size:
+            point_number += len(level[sstable_number])
+            sstable_number += 1
+        compacted = level.pop_head(sstable_number)
+        position, overlapped = next_level.pop_range(compacted[0].min_val, compacted[-1].max_val)
+        merge_list = overlapped + compacted
+        self.__count_writes(level_index + 1, count_point(merge_list))
+        self.compaction_numbers[level_index] += 1
+        if len(merge_list) == 1:
+            # merge_sort keeps a single sstable as it is, while it is written to the next level once more
+            merge_list[0].rewrite()
+            next_level.insert(position, merge_list)
+        else:
+            next_level.insert(position, merge_sort(merge_list, next_sstable_size, self.merge_method))
+
+    def write_amplification_per_level(self):
+        """
+        The write amplification of each level
+        :return: a list of the write times of data points on each level divided by the number of data points written,
+        which sums up to the total write amplification
+        """
+        return [float(write_times) / max(self.data_point_number, 1) for write_times in self.level_write_times]
+
+    def get_write_amplification(self):
+        """
+        Sum the write times of all data points on all the levels
+        :return: number of data points on the levels, and the sum of their write times
+        """
+        point_number = 0
+        write_times = 0
+        for level in self.levels:
+            for sstable in level:
+                point_number += len(sstable)
+                if not self.metrics_only:
+                    write_times += sstable.get_write_times()
+        if self.metrics_only:
+            # the sstables do not record write times, use the sum collected during writing
+            write_times = self.total_write_times
+        return point_number, write_times
+
+
+if __name__ == '__main__':
+    arg_time_interval = 50
+    arg_data_point_number = 1000000
+    arg_buffer_size = 512
+    arg_sequential_buffer_size = 256
+    # the level compaction of IoTDB, see iotdb-engine.properties
+    arg_level_number = 10
+    arg_size_ratio = 2
+    arg_max_sstable_number = 6
+
+    data_points = generate_data_points_with_delay(arg_time_interval, arg_data_point_number, mu=4, sigma=1.5)
+    engines = {
+        'lsm': LeveledLSM(PlainPolicy(arg_buffer_size), arg_level_number, arg_buffer_size, arg_size_ratio,
+                          arg_max_sstable_number, metrics_only=True),
+        'tlsm': LeveledLSM(SeparatedPolicy(arg_sequential_buffer_size, arg_buffer_size - arg_sequential_buffer_size),
+                           arg_level_number, arg_buffer_size, arg_size_ratio, arg_max_sstable_number, metrics_only=True),
+    }
+    for name, engine in engines.items():
+        engine.write_many(data_points[:, 0])
+        engine.flush()
+        print(name, 'write amplification=', float(engine.total_write_times) / engine.data_point_number)
+        print(name, 'write amplification per level=', ','.join(map(str, engine.write_amplification_per_level())))
+        print(name, 'sstables per level=', ','.join(str(len(level)) for level in engine.levels))
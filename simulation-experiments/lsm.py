@@ -1,22 +1,27 @@
 import numpy as np
 
-from sstable import SSTable
+from level import Level
+from sstable import form_sstable
 from algorithm_utils import merge_sort
 
 def count_point(ssts):
     ret = 0
     for sst in ssts:
         assert sst.index == 0
-        ret += len(sst.data_list)
+        ret += len(sst)
     return ret
 
 class LSM:
-    def __init__(self, buffer_size=8, sstable_size=None, statistics_number=20):
+    def __init__(self, buffer_size=8, sstable_size=None, statistics_number=20, merge_method='sort',
+                 metrics_only=False):
         """
         Initialize a 2-level LSM structure
         :param buffer_size: the capacity of component in memory, that is C0
         :param sstable_size: the capacity of component in L1, which is also called sstable
         :param statistics_number: the number of observations in calculating statistics
+        :param merge_method: how sstables are merge sorted, 'sort' or 'heap', see algorithm_utils.merge_sort
+        :param metrics_only: if set, sstables do not record the write times of data points, only the statistics and
+        total_write_times are collected
         """
 
         self.buffer_size = buffer_size
@@ -24,8 +29,8 @@ class LSM:
         self.sstable_size = sstable_size if sstable_size is not None else buffer_size
         # the component in memory, C0
         self.buffer = []
-        # LEVEL1, which is a list of sstables
-        self.level_1 = []
+        # LEVEL1, which is a list of sstables ordered by generate time
+        self.level_1 = Level()
 
         # record the number of sstables to merge in each cycle
         self.history_merge_sstable_number = []
@@ -34,6 +39,8 @@ class LSM:
         self.statistics_number = statistics_number
 
         self.total_write_times = 0
+        self.merge_method = merge_method
+        self.metrics_only = metrics_only
 
     def write(self, val):
         """
@@ -46,23 +53,31 @@ class LSM:
         if len(self.buffer) == self.buffer_size:
             self.__write_buffer()
 
+    def write_many(self, values):
+        """
+        Write a batch of values to the LSM structure, which is the same as writing them one by one
+        :param values: an array of the values to write, in arrival order
+        """
+        values = np.asarray(values, dtype=np.float64)
+        start = 0
+        while start < len(values):
+            # fill the buffer C0 with a chunk of values, and form an sstable if the buffer is full
+            end = min(start + self.buffer_size - len(self.buffer), len(values))
+            self.buffer.extend(values[start:end].tolist())
+            start = end
+            if len(self.buffer) == self.buffer_size:
+                self.__write_buffer()
+
     def __write_buffer(self):
         """
         Form a sstable with whatever inside the buffer C0, write it to L1, and finally clear the buffer
         :return:
         """
         if len(self.buffer) > 0:
-            # retrieve the content in buffer
-            data_point_list = self.buffer.copy()
-            # sort the data points by generate time
-            data_point_list.sort()
-            # a list of <generate_time, write_times> pairs
-            pairs = []
-            for i in data_point_list:
-                # for each data points, form a pair <generate_time, write_times>, write_times is initialize as 0
-                pairs.append([i, 0])
-            # form an sstable
-            sst = SSTable(pairs, data_point_list[0], data_point_list[len(data_point_list) - 1], False)
+            # retrieve the content in buffer, and sort the data points by generate time
+            data_points = np.sort(np.array(self.buffer, dtype=np.float64))
+            # form an sstable, the write times of each data point is initialized as 0
+            sst = form_sstable(data_points, 0, self.metrics_only)
             self.__merge(sst)
             self.buffer.clear()
 
@@ -72,19 +87,10 @@ class LSM:
         :param new_sstable: a new sstable
         """
         # record the sstables need to participate in merge sort
-        merge_list = []
-        # iterate the sstables in LEVEL1 from tail (with later generate time) to head (with earlier generate time)
-        # to check whether it has overlapped generate time range with the new sstable
-        while len(self.level_1) > 0:
-            last_sstable = self.level_1.pop()
-            if last_sstable.max_val > new_sstable.min_val:
-                # overlapped generate time range exists, remove it from LEVEL1 and append the sstable to the list
-                merge_list.append(last_sstable)
-            else:
-                # current sstable has no overlap generate time range with the new sstable
-                # put it back to the tail of LEVEL1
-                self.level_1.append(last_sstable)
-                break
+        # the sstables on LEVEL1 which have overlapped generate time range with the new sstable are found by binary
+        # search, and removed from LEVEL1 in one slice, ordered from tail (with later generate time) to head (with
+        # earlier generate time)
+        merge_list = self.level_1.pop_overlapped(new_sstable.min_val)
         # record the number of sstables in LEVEL1 to merge
         self.history_merge_sstable_number.append(len(merge_list))
         # record the write amplification history
@@ -95,14 +101,14 @@ class LSM:
             # Because it simulate that the data points is written to the disk, we increase the write times of
             # each data points by one
             new_sstable.rewrite()
-            self.total_write_times += len(new_sstable.data_list)
+            self.total_write_times += len(new_sstable)
             self.level_1.append(new_sstable)
         else:
             # append the new sstable to the merge list, apply merge sort generate several sstables, and append
             # the at the end of LEVEL1
             merge_list.append(new_sstable)
             self.total_write_times += count_point(merge_list)
-            self.level_1.extend(merge_sort(merge_list, self.sstable_size))
+            self.level_1.extend(merge_sort(merge_list, self.sstable_size, self.merge_method))
 
     def flush(self):
         """
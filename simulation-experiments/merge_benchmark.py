@@ -0,0 +1,78 @@
+import time
+
+from algorithm_utils import *
+
+np.random.seed(4834)
+
+arg_sstable_size = 512
+arg_min_sstable_number = 2
+arg_max_sstable_number = 512
+arg_repeat = 3
+# the point-by-point merge of sstables holding lists of pairs, which is slow for large k
+arg_with_pointwise = True
+
+
+def prepare_sstables(sstable_number, sstable_size, columnar=True):
+    """
+    Prepare the input of a merge like the one of a non-sequential flush in tLSM. The last sstable_number - 1 sstables on
+    LEVEL1 cover consecutive generate time ranges, and the new sstable overlaps all of them.
+    :param sstable_number: number of sstables participating in the merge, k
+    :param sstable_size: number of data points in each sstable
+    :param columnar: form ColumnarSSTables or SSTables
+    :return: a list of sstables in the order given by the merge in LSM, that is, LEVEL1 from tail to head, and the new
+    sstable at last
+    """
+    total_number = (sstable_number - 1) * sstable_size
+    generate_times = np.arange(total_number, dtype=np.float64)
+    sstables = []
+    for start in range(0, total_number, sstable_size):
+        keys = generate_times[start:start + sstable_size]
+        sstables.append(build_sstable(keys, 1, columnar))
+    sstables.reverse()
+    new_keys = np.sort(np.random.uniform(0, total_number, sstable_size))
+    sstables.append(build_sstable(new_keys, 0, columnar))
+    return sstables
+
+
+def build_sstable(keys, write_times, columnar):
+    """
+    Form an sstable with the given keys
+    :param keys: sorted generate times of the data points
+    :param write_times: initial write times of the data points
+    :param columnar: form a ColumnarSSTable or an SSTable
+    :return: an sstable
+    """
+    if columnar:
+        return ColumnarSSTable(keys, write_times, keys[0], keys[-1], 0)
+    return SSTable([[key, write_times] for key in keys], keys[0], keys[-1], 0)
+
+
+def measure(sstable_number, method, columnar=True):
+    """
+    Measure the time cost of merging sstable_number sstables
+    :param sstable_number: number of sstables participating in the merge, k
+    :param method: merge method passed to merge_sort
+    :param columnar: merge ColumnarSSTables or SSTables
+    :return: the minimal time cost among arg_repeat runs, in seconds
+    """
+    costs = []
+    for _ in range(arg_repeat):
+        sstables = prepare_sstables(sstable_number, arg_sstable_size, columnar)
+        start = time.perf_counter()
+        merge_sort(sstables, arg_sstable_size, method)
+        costs.append(time.perf_counter() - start)
+    return min(costs)
+
+
+if __name__ == '__main__':
+    sstable_number = arg_min_sstable_number
+    while sstable_number <= arg_max_sstable_number:
+        sort_cost = measure(sstable_number, 'sort')
+        heap_cost = measure(sstable_number, 'heap')
+        pointwise_cost = measure(sstable_number, 'sort', False) if arg_with_pointwise else np.nan
+        print('sstable_number=' + str(sstable_number),
+              'pointwise_cost=' + str(pointwise_cost),
+              'sort_cost=' + str(sort_cost),
+              'heap_cost=' + str(heap_cost),
+              'sort/heap=' + str(sort_cost / heap_cost))
+        sstable_number *= 2
@@ -1,18 +1,23 @@
+import os
+import sys
+
 import numpy as np
 
+# the delay files are loaded and cached by data-generation/delay_set.py, which is shared with the data generation
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data-generation'))
+from delay_set import load_delays
+
 np.random.seed(4834)
 
 
 class RealDelay:
     def __init__(self, path='delay_milli.txt', line_num=1024) -> None:
+        """
+        :param path: path of the delay file, one integer delay per line
+        :param line_num: not used, the delay file is loaded by load_delays
+        """
         super().__init__()
-        self.delay_data = []
-        with open(path, 'r') as delay_file:
-            lines = delay_file.readlines(line_num)
-            while lines:
-                vals = list(map(int, lines))
-                self.delay_data += vals
-                lines = delay_file.readlines(line_num)
+        self.delay_data = load_delays(path)
 
     def get_delays(self, num=1):
         return np.random.choice(self.delay_data, num)
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+# name of the result of an LSM task
+LSM_RESULT_NAME = 'lsm_average_sstable_merge_number'
+
+
+class ResultStore:
+    """
+    A directory of result shards, one .npz file for each completed task. A shard holds the result rows of a task as
+    typed columns, and it is written atomically, so that a sweep interrupted at any time can be resumed by skipping the
+    tasks with a shard.
+    """
+
+    def __init__(self, path) -> None:
+        """
+        Open a result store, the directory is created if it does not exist
+        :param path: path of the directory
+        """
+        super().__init__()
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def __shard_path(self, task):
+        # a sweep has tens of thousands of tasks, so a 32-bit checksum of the task is not enough to avoid collisions
+        return os.path.join(self.path, hashlib.sha256(repr(task).encode()).hexdigest() + '.npz')
+
+    def contains(self, task):
+        """
+        Check whether the result of a task is stored
+        :param task: a tuple, the configuration of the task
+        :return: the result is stored or not
+        """
+        shard_path = self.__shard_path(task)
+        if not os.path.exists(shard_path):
+            return False
+        with np.load(shard_path) as shard:
+            return str(shard['task']) == repr(task)
+
+    def save(self, task, columns):
+        """
+        Store the result rows of a task
+        :param task: a tuple, the configuration of the task
+        :param columns: a dict from column name to the values of the column, one value for each row
+        """
+        arrays = {name: np.asarray(values) for name, values in columns.items()}
+        arrays['task'] = np.array(repr(task))
+        # write to a temporary file first, and rename it, so that a shard is never partially written
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(file_descriptor, 'wb') as temporary_file:
+            np.savez(temporary_file, **arrays)
+        os.replace(temporary_path, self.__shard_path(task))
+
+    def load(self, task):
+        """
+        Load the result rows of a task
+        :param task: a tuple, the configuration of the task
+        :return: a dict from column name to an array
+        """
+        with np.load(self.__shard_path(task)) as shard:
+            return {name: shard[name] for name in shard.files if name != 'task'}
+
+    def load_all(self, column):
+        """
+        Load the result rows of all the tasks having the given column, e.g., all the LSM tasks or all the tLSM tasks
+        :param column: name of a column
+        :return: a dict from column name to an array, concatenating the rows of those tasks
+        """
+        shards = []
+        for file_name in sorted(os.listdir(self.path)):
+            if not file_name.endswith('.npz'):
+                continue
+            with np.load(os.path.join(self.path, file_name)) as shard:
+                if column in shard.files:
+                    shards.append({name: shard[name] for name in shard.files if name != 'task'})
+        if len(shards) == 0:
+            return {}
+        return {name: np.concatenate([shard[name] for shard in shards]) for name in shards[0]}
+
+
+def sweep_columns(key_names, tlsm_result_names, task, result):
+    """
+    Transform the result of a sweep task, see sweep_runner.make_tasks, to columns
+    :param key_names: names of the elements of the task key, e.g., time_interval, mu and sigma
+    :param tlsm_result_names: names of the elements of the statistic results of a tLSM structure
+    :param task: a tuple, <*key, a tuple of sequential buffer sizes or None>
+    :param result: the result of the task
+    :return: a dict from column name to the values of the column
+    """
+    key, sequential_buffer_sizes = task[:-1], task[-1]
+    if sequential_buffer_sizes is None:
+        columns = {name: [value] for name, value in zip(key_names, key)}
+        columns[LSM_RESULT_NAME] = [result]
+        return columns
+    columns = {name: [value] * len(sequential_buffer_sizes) for name, value in zip(key_names, key)}
+    columns['sequential_buffer_size'] = list(sequential_buffer_sizes)
+    for name, values in zip(tlsm_result_names, zip(*result)):
+        columns[name] = list(values)
+    return columns
+
+
+def save_completed(store, completed, columns):
+    """
+    Store the result of each completed task as soon as it completes
+    :param store: a ResultStore
+    :param completed: an iterator of <task, result, process id, time cost>, given by sweep_runner.run_tasks
+    :param columns: a function transforming a task and its result to columns
+    :return: the same iterator as completed
+    """
+    for task, result, process_id, cost in completed:
+        store.save(task, columns(task, result))
+        yield task, result, process_id, cost
+
+
+def pending_tasks(store, tasks):
+    """
+    Find the tasks of a sweep to execute, and the LSM results already stored
+    :param store: a ResultStore
+    :param tasks: a list of tasks, given by sweep_runner.make_tasks
+    :return: a list of the tasks without stored result, and a dict from task key to the stored LSM result
+    """
+    pending = []
+    lsm_results = {}
+    for task in tasks:
+        if not store.contains(task):
+            pending.append(task)
+        elif task[-1] is None:
+            lsm_results[task[:-1]] = store.load(task)[LSM_RESULT_NAME][0]
+    return pending, lsm_results
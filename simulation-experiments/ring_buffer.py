@@ -0,0 +1,126 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    A ring buffer over a numpy array. The capacity of the ring buffer is fixed. Elements are constantly added to the
+    ring buffer. When the ring buffer is full, the oldest elements are removed to make room for the new elements.
+    The sum and the sum of squares of the elements are kept up to date, so the mean and the variance cost O(1).
+    """
+
+    def __init__(self, capacity, dtype=np.float64) -> None:
+        """
+        Constructor of a RingBuffer
+        :param capacity: maximal number of elements the ring buffer can hold
+        :param dtype: data type of the elements
+        """
+        super().__init__()
+        self.capacity = capacity
+        self.values = np.zeros(capacity, dtype=dtype)
+        # position of the oldest element
+        self.start = 0
+        self.length = 0
+        self.element_sum = 0.0
+        self.square_sum = 0.0
+        # number of elements added since the sums were computed from the elements, the sums are recomputed once every
+        # capacity elements, so the rounding errors of removing elements do not accumulate
+        self.added_number = 0
+
+    def __len__(self):
+        return self.length
+
+    def full(self):
+        return self.length == self.capacity
+
+    def __count_added(self, number):
+        self.added_number += number
+        if self.added_number >= self.capacity:
+            values = self.to_array().astype(np.float64)
+            self.element_sum = float(values.sum())
+            self.square_sum = float(np.dot(values, values))
+            self.added_number = 0
+
+    def __positions(self, offset, number):
+        # positions of the elements from the offset-th oldest one
+        return (self.start + offset + np.arange(number)) % self.capacity
+
+    def append(self, value):
+        """
+        Add an element to the ring buffer
+        :param value: the element
+        :return: an array of the removed element, empty if the ring buffer was not full
+        """
+        position = (self.start + self.length) % self.capacity
+        if self.length == self.capacity:
+            removed = self.values[position:position + 1].copy()
+            self.start = (self.start + 1) % self.capacity
+            # update the sums with scalars, which is much cheaper than with arrays of one element
+            removed_value = float(removed[0])
+            self.element_sum -= removed_value
+            self.square_sum -= removed_value * removed_value
+        else:
+            removed = self.values[:0].copy()
+            self.length += 1
+        self.values[position] = value
+        value = float(self.values[position])
+        self.element_sum += value
+        self.square_sum += value * value
+        self.__count_added(1)
+        return removed
+
+    def extend(self, values):
+        """
+        Add elements to the ring buffer, which is the same as adding them one by one
+        :param values: an array of the elements, from the oldest to the newest
+        :return: an array of the removed elements, from the oldest to the newest, including the new elements removed
+        right away if there are more new elements than the capacity
+        """
+        values = np.asarray(values, dtype=self.values.dtype)
+        added = values
+        # remove the oldest elements to make room for the new ones
+        removed_number = min(max(self.length + len(values) - self.capacity, 0), self.length)
+        removed = [self.values[self.__positions(0, removed_number)]]
+        self.start = (self.start + removed_number) % self.capacity
+        self.length -= removed_number
+        if len(values) > self.capacity:
+            removed.append(values[:len(values) - self.capacity])
+            values = values[len(values) - self.capacity:]
+        self.values[self.__positions(self.length, len(values))] = values
+        self.length += len(values)
+        removed = np.concatenate(removed)
+        added = added.astype(np.float64)
+        removed_values = removed.astype(np.float64)
+        self.element_sum += float(added.sum()) - float(removed_values.sum())
+        self.square_sum += float(np.dot(added, added)) - float(np.dot(removed_values, removed_values))
+        self.__count_added(len(added))
+        return removed
+
+    def to_array(self):
+        """
+        :return: an array of the elements, from the oldest to the newest
+        """
+        return self.values[self.__positions(0, self.length)]
+
+    def mean(self):
+        """
+        Mean of the elements in the ring buffer
+        :return: the mean
+        """
+        return self.element_sum / self.length
+
+    def variance(self):
+        """
+        Population variance of the elements in the ring buffer
+        :return: the variance
+        """
+        mean = self.mean()
+        # clip the rounding error of subtracting two close numbers
+        return max(self.square_sum / self.length - mean * mean, 0.0)
+
+    def percentile(self, q):
+        """
+        Percentiles of the elements in the ring buffer, which are computed from a snapshot of the elements
+        :param q: a percentile in [0, 100], or an array of percentiles
+        :return: the percentile, or an array of the percentiles
+        """
+        return np.percentile(self.to_array(), q)
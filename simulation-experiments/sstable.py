@@ -17,6 +17,9 @@ class SSTable:
         self.index = index_
         self.is_from_merge_sort = is_merge_sorted
 
+    def __len__(self):
+        return len(self.data_list)
+
     def to_string(self):
         return 'sstable:(' + str(self.is_from_merge_sort) + ')' + str(self.data_list)
 
@@ -59,3 +62,145 @@ class SSTable:
         :return: write times sum of all data points
         """
         return sum(np.array(self.data_list)[:, 1])
+
+
+class ColumnarSSTable:
+    def __init__(self, generate_times_, write_times_, min_, max_, index_, is_merge_sorted=False):
+        """
+        Construct an SSTable whose data points are stored column by column in two contiguous arrays
+        :param generate_times_: an array of the generate times of data points, ordered by generate time
+        :param write_times_: an array of the write times of data points, or a single value shared by all data points
+        :param min_: minimal key of the SSTable
+        :param max_: maximal key of the SSTable
+        :param index_: a pointer, indicating the valid start index of this SSTable
+        :param is_merge_sorted: mark if the SSTable is generated from merge sorting or not
+        """
+        self.generate_times = np.asarray(generate_times_, dtype=np.float64)
+        if np.ndim(write_times_) == 0:
+            self.write_times = np.full(len(self.generate_times), write_times_, dtype=np.int32)
+        else:
+            self.write_times = np.asarray(write_times_, dtype=np.int32)
+        self.min_val = min_
+        self.max_val = max_
+        self.index = index_
+        self.is_from_merge_sort = is_merge_sorted
+
+    def __len__(self):
+        return len(self.generate_times)
+
+    @property
+    def data_list(self):
+        """
+        A read-only view of the SSTable as <generate_time, write_times> pairs, compatible with SSTable.data_list
+        :return: an array with 2 columns, generate time and write times
+        """
+        return np.column_stack((self.generate_times, self.write_times))
+
+    def to_string(self):
+        return 'sstable:(' + str(self.is_from_merge_sort) + ')' + str(self.data_list.tolist())
+
+    def peek(self):
+        """
+        To get the minimal key in the SSTable
+        :return: the key of the element pointed by self.index
+        """
+        # if the index is out of bound, return np.nan
+        if self.index >= len(self.generate_times):
+            return np.nan
+        else:
+            return self.generate_times[self.index]
+
+    def pop(self):
+        """
+        To get the element with minimal key, and remove it from SSTable
+        :return: the element with minimal key, the element's write times is increased by one
+        """
+        if self.index >= len(self.generate_times):
+            print('pop none')
+            return None
+        else:
+            self.write_times[self.index] += 1
+            pair = [self.generate_times[self.index], self.write_times[self.index]]
+            self.index += 1
+            return pair
+
+    def remaining(self):
+        """
+        To get the elements that have not been popped yet
+        :return: the generate times and the write times of the remaining elements, as array slices
+        """
+        return self.generate_times[self.index:], self.write_times[self.index:]
+
+    def rewrite(self):
+        """
+        Rewrite the SSTable will increase the write times of all data points inside the SSTable by one
+        """
+        self.write_times += 1
+
+    def get_write_times(self):
+        """
+        Calculate the sum of the write times of all data points
+        :return: write times sum of all data points
+        """
+        return int(np.sum(self.write_times, dtype=np.int64))
+
+
+class MetricsSSTable:
+    def __init__(self, generate_times_, min_, max_, index_, is_merge_sorted=False):
+        """
+        Construct an SSTable which does not record the write times of its data points. Only the generate times are
+        kept, because the boundaries of the sstables generated from merging it depend on them.
+        :param generate_times_: an array of the generate times of data points, ordered by generate time
+        :param min_: minimal key of the SSTable
+        :param max_: maximal key of the SSTable
+        :param index_: a pointer, indicating the valid start index of this SSTable
+        :param is_merge_sorted: mark if the SSTable is generated from merge sorting or not
+        """
+        self.generate_times = np.asarray(generate_times_, dtype=np.float64)
+        self.min_val = min_
+        self.max_val = max_
+        self.index = index_
+        self.is_from_merge_sort = is_merge_sorted
+
+    def __len__(self):
+        return len(self.generate_times)
+
+    def to_string(self):
+        return 'sstable:(' + str(self.is_from_merge_sort) + ')' + str(self.generate_times.tolist())
+
+    def peek(self):
+        """
+        To get the minimal key in the SSTable
+        :return: the key of the element pointed by self.index
+        """
+        # if the index is out of bound, return np.nan
+        if self.index >= len(self.generate_times):
+            return np.nan
+        else:
+            return self.generate_times[self.index]
+
+    def remaining(self):
+        """
+        To get the elements that have not been merged yet
+        :return: the generate times of the remaining elements, as an array slice
+        """
+        return self.generate_times[self.index:]
+
+    def rewrite(self):
+        """
+        The write times of data points are not recorded, nothing to do
+        """
+        pass
+
+
+def form_sstable(generate_times, write_times, metrics_only=False):
+    """
+    Form an sstable with data points ordered by generate time
+    :param generate_times: an array of the generate times of data points, ordered by generate time
+    :param write_times: initial write times of the data points
+    :param metrics_only: form a MetricsSSTable, which does not record write times, or a ColumnarSSTable
+    :return: an sstable, which is not generated from merge sort
+    """
+    if metrics_only:
+        return MetricsSSTable(generate_times, generate_times[0], generate_times[-1], 0)
+    return ColumnarSSTable(generate_times, write_times, generate_times[0], generate_times[-1], 0)
@@ -0,0 +1,39 @@
+import numpy as np
+
+from tlsm import tLSM
+
+
+def sweep(points, buffer_size, sequential_buffer_sizes, statistics, statistics_number, flush=False, chunk_size=None,
+          **kwargs):
+    """
+    Conduct experiments on tlsm with several sequential buffer sizes over the same data points. The tlsm structures are
+    replayed in lockstep: the data points are cut into chunks once, and every chunk is written to all the tlsm
+    structures before the next one. Only the chunking is shared, each tlsm structure still splits the data points into
+    sequential and nonsequential ones against its own LEVEL1, which differs with the sequential buffer size. The sweep
+    runs in the calling process, sweep_runner.run_tasks runs the sweeps of groups of sequential buffer sizes in parallel.
+    :param points: data points, an array of generate time in arrival order
+    :param buffer_size: sum of the capacities of the sequential buffer and the non-sequential buffer
+    :param sequential_buffer_sizes: a list of capacities of the sequential buffer
+    :param statistics: a function that collects the statistic results of a tlsm structure, given the tlsm structure and
+    statistics_number
+    :param statistics_number: the number of observations in calculating statistics
+    :param flush: flush the buffers of the tlsm structures after writing all data points or not
+    :param chunk_size: number of data points in a chunk
+    :param kwargs: other arguments passed to tLSM
+    :return: a list of statistic results, in the order of sequential_buffer_sizes
+    """
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    chunk_size = 16 * buffer_size if chunk_size is None else chunk_size
+    tlsms = []
+    for sequential_buffer_size in sequential_buffer_sizes:
+        tlsms.append(tLSM(sequential_buffer_size, buffer_size - sequential_buffer_size, buffer_size, **kwargs))
+    for start in range(0, len(points), chunk_size):
+        chunk = points[start:start + chunk_size]
+        for tlsm in tlsms:
+            tlsm.write_many(chunk)
+    results = []
+    for tlsm in tlsms:
+        if flush:
+            tlsm.flush()
+        results.append(statistics(tlsm, statistics_number))
+    return results
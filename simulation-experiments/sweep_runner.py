@@ -0,0 +1,113 @@
+import functools
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+
+def seed_task(*key):
+    """
+    Seed the random generator of numpy with the key of a task, so that the task generates the same data points in
+    whichever process it is executed
+    :param key: the key of a task, e.g., time interval, mu and sigma
+    """
+    np.random.seed(zlib.crc32(repr(key).encode()))
+
+
+def shared_points(path, key, generate, *args):
+    """
+    Generate the data points of a task key once, and share them among all the processes through a memory-mapped .npy
+    file, so that the processes writing the same data points do not keep a copy each. The first process needing the
+    data points generates and publishes them, the others attach to the published file.
+    :param path: directory of the published data points, e.g., a temporary directory under /dev/shm
+    :param key: the key of a task, e.g., time interval, mu and sigma, which seeds the random generator
+    :param generate: a function generating the data points, e.g., generate_data_points
+    :param args: arguments passed to generate
+    :return: a read-only array of the data points
+    """
+    # named by a digest strong enough that two task keys never share a file, see result_store.ResultStore
+    points_path = os.path.join(path, hashlib.sha256(repr((key, args)).encode()).hexdigest() + '.npy')
+    if not os.path.exists(points_path):
+        seed_task(*key)
+        points = np.asarray(generate(*args), dtype=np.float64)
+        # write to a temporary file first, and rename it, so that no process attaches to a partially written file
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=path, suffix='.tmp')
+        with os.fdopen(file_descriptor, 'wb') as temporary_file:
+            np.save(temporary_file, points)
+        os.replace(temporary_path, points_path)
+    return np.load(points_path, mmap_mode='r')
+
+
+def timed_call(work, task):
+    """
+    Execute a task, and measure its time cost
+    :param work: a function, called with the elements of the task as arguments
+    :param task: a tuple
+    :return: the task, the result of the task, the id of the process executing the task, and the time cost in seconds
+    """
+    start = time.perf_counter()
+    result = work(*task)
+    return task, result, os.getpid(), time.perf_counter() - start
+
+
+def run_tasks(work, tasks, process_num=None):
+    """
+    Execute tasks on a pool of processes. The tasks are kept in a shared queue, and a process takes the next task as
+    soon as it finishes the previous one, so that long tasks do not leave the other processes idle.
+    :param work: a function defined at module level (or a functools.partial of it), called with the elements of a task
+    as arguments
+    :param tasks: a list of tasks, each of them is a tuple
+    :param process_num: number of processes, the number of CPUs by default
+    :return: an iterator of <task, result, process id, time cost in seconds>, in the order of completion
+    """
+    process_num = os.cpu_count() if process_num is None else process_num
+    with multiprocessing.Pool(min(process_num, max(len(tasks), 1))) as pool:
+        yield from pool.imap_unordered(functools.partial(timed_call, work), tasks, chunksize=1)
+
+
+def make_tasks(keys, sequential_buffer_sizes, group_size=1):
+    """
+    Make the tasks of a sweep. For each key, there is a task writing the LSM structure, and several tasks writing tLSM
+    structures, each of them with a group of sequential buffer sizes. The LSM tasks come first, and the keys are kept
+    in the given order, so that the slow tasks can be given first.
+    :param keys: a list of keys, e.g., <time interval, mu, sigma>
+    :param sequential_buffer_sizes: a list of capacities of the sequential buffer
+    :param group_size: number of sequential buffer sizes in a task
+    :return: a list of tasks, each of them is <*key, a tuple of sequential buffer sizes>, where the sequential buffer
+    sizes are None for the LSM task
+    """
+    tasks = []
+    for key in keys:
+        tasks.append(tuple(key) + (None,))
+    for key in keys:
+        for start in range(0, len(sequential_buffer_sizes), group_size):
+            tasks.append(tuple(key) + (tuple(sequential_buffer_sizes[start:start + group_size]),))
+    return tasks
+
+
+def join_lsm_results(completed, lsm_results=None):
+    """
+    Join the result of each tLSM task with the result of the LSM task of the same key. A tLSM task completed earlier
+    than the LSM task of its key is held until the LSM task completes.
+    :param completed: an iterator of <task, result, process id, time cost>, given by run_tasks on the tasks from
+    make_tasks
+    :param lsm_results: a dict from key to the result of LSM tasks completed before, e.g., in a resumed sweep
+    :return: an iterator of <task, result, process id, time cost, LSM result>, where LSM result is None for LSM tasks
+    """
+    lsm_results = {} if lsm_results is None else dict(lsm_results)
+    held = {}
+    for task, result, process_id, cost in completed:
+        key = task[:-1]
+        if task[-1] is None:
+            lsm_results[key] = result
+            yield task, result, process_id, cost, None
+            for held_task in held.pop(key, []):
+                yield held_task + (result,)
+        elif key in lsm_results:
+            yield task, result, process_id, cost, lsm_results[key]
+        else:
+            held.setdefault(key, []).append((task, result, process_id, cost))
@@ -0,0 +1,25 @@
+import numpy as np
+
+from algorithm_utils import generate_data_points, generate_data_points_with_delay, generate_data_points_real_delay, \
+    stream_data_points, stream_data_points_with_delay, stream_data_points_real_delay
+
+
+def test_streams_are_the_same_as_the_whole_arrays():
+    np.random.seed(0)
+    expected = generate_data_points(50, 100000)
+    np.random.seed(0)
+    assert np.array_equal(np.concatenate(list(stream_data_points(50, 100000, chunk_size=4096))), expected)
+
+    np.random.seed(0)
+    expected = generate_data_points_with_delay(50, 100000)
+    np.random.seed(0)
+    assert np.array_equal(np.concatenate(list(stream_data_points_with_delay(50, 100000, chunk_size=4096))), expected)
+
+
+def test_real_delay_stream_is_the_same_as_the_whole_array():
+    # the real delays are integers, so many data points arrive at the same time
+    np.random.seed(0)
+    expected = generate_data_points_real_delay(50, 100000, 'ty.txt')
+    np.random.seed(0)
+    chunks = list(stream_data_points_real_delay(50, 100000, 'ty.txt', chunk_size=4096))
+    assert np.array_equal(np.concatenate(chunks), expected)
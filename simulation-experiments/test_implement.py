@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from algorithm_utils import generate_data_points_with_delay
+from implement import Hybrid
+
+
+def write_in_chunks(hybrid, data_points, chunk_size=4096):
+    """
+    Write the data points to a Hybrid structure chunk by chunk
+    :return: the η of LSM, the predicted write amplification rate and the sequential buffer size right after switching
+    to tLSM
+    """
+    switch = None
+    for start in range(0, len(data_points), chunk_size):
+        chunk = data_points[start:start + chunk_size]
+        hybrid.write_many(chunk[:, 0], chunk[:, 2])
+        if hybrid.use_tlsm and switch is None:
+            switch = (hybrid.lsm_eta_list.mean(), hybrid.predicted_write_amplification, hybrid.sequential_buffer_size)
+    return switch
+
+
+def test_retune_on_stationary_input_keeps_the_prediction():
+    np.random.seed(0)
+    data_points = generate_data_points_with_delay(50, 300000, mu=4, sigma=1.5)
+    hybrid = Hybrid(512, 50, retune_cycles=10)
+    eta, predicted, sequential_buffer_size = write_in_chunks(hybrid, data_points)
+    # the merges of tLSM are not taken as the η of LSM
+    assert hybrid.lsm_eta_list.mean() == eta
+    assert hybrid.history_retuning == []
+    assert hybrid.sequential_buffer_size == sequential_buffer_size
+    assert abs(hybrid.predicted_write_amplification - predicted) < 0.01 * predicted
+
+
+def test_misprediction_is_corrected_by_one_retune():
+    np.random.seed(0)
+    data_points = generate_data_points_with_delay(2, 500000, mu=4, sigma=1.5)
+    hybrid = Hybrid(512, 2, statistics_number=100, prediction_error_threshold=0.1)
+    _, predicted, sequential_buffer_size = write_in_chunks(hybrid, data_points)
+    # the cost model underestimates the write amplification of this distribution with the η of LSM
+    observed = hybrid.total_write_times / len(data_points)
+    assert abs(observed - predicted) > 0.1 * predicted
+    assert len(hybrid.history_calibration) == 1
+    assert hybrid.sequential_buffer_size == sequential_buffer_size
+    assert abs(hybrid.prediction_error()) < 0.1
+
+
+def test_prediction_error_threshold_needs_full_windows():
+    with pytest.raises(ValueError):
+        Hybrid(512, 2, statistics_number=20, retune_cycles=10, prediction_error_threshold=0.1)
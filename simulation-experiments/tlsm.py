@@ -1,5 +1,8 @@
-from sstable import SSTable
-from algorithm_utils import merge_sort
+import numpy as np
+
+from level import Level
+from sstable import form_sstable
+from algorithm_utils import merge_sort, next_flush_segment
 
 
 def count(sstables):
@@ -18,10 +21,10 @@ def count(sstables):
     for sst in sstables:
         if sst.is_from_merge_sort:
             merge_sorted_sstable_number += 1
-            merge_sorted_points_number += len(sst.data_list)
+            merge_sorted_points_number += len(sst)
         else:
             direct_flushed_sstable_number += 1
-            direct_flushed_points_number += len(sst.data_list)
+            direct_flushed_points_number += len(sst)
     return merge_sorted_sstable_number, direct_flushed_sstable_number, merge_sorted_points_number, \
            direct_flushed_points_number
 
@@ -30,17 +33,21 @@ def count_point(ssts):
     ret = 0
     for sst in ssts:
         assert sst.index == 0
-        ret += len(sst.data_list)
+        ret += len(sst)
     return ret
 
 
 class tLSM:
-    def __init__(self, sequential_buffer_size=8, nonsequential_buffer_size=8, sstable_size=None):
+    def __init__(self, sequential_buffer_size=8, nonsequential_buffer_size=8, sstable_size=None, merge_method='sort',
+                 metrics_only=False):
         """
         Initialize a 2-level tLSM structure, which consists of 2 component in memory, and LEVEL1 for storing sstables
         :param sequential_buffer_size: capacity of sequential buffer in memory
         :param nonsequential_buffer_size: capacity of non-sequential buffer in memory
         :param sstable_size: capacity of components/sstables on LEVEL1
+        :param merge_method: how sstables are merge sorted, 'sort' or 'heap', see algorithm_utils.merge_sort
+        :param metrics_only: if set, sstables do not record the write times of data points, only the statistics and
+        the sum of write times are collected
         """
         # if the capacity of output sstable is not set, use the sum of the sequential buffer size and non-sequential 
         # buffer size
@@ -56,8 +63,12 @@ class tLSM:
 
         # initialize LEVEL1
         self.sstable_size = sstable_size
-        self.level_1 = []
+        self.level_1 = Level()
         self.max_generate_time_on_level_1 = 0
+        self.merge_method = merge_method
+        self.metrics_only = metrics_only
+        # sum of the write times of all data points on LEVEL1
+        self.level_1_write_times = 0
 
         # record how many sequence files are generated during a cycle
         self.sequential_buffer_flush_times_per_cycle = 0
@@ -107,6 +118,75 @@ class tLSM:
             if len(self.nonsequential_buffer) == self.nonsequential_buffer_size:
                 self.__write_nonsequential_buffer(outPutFile)
 
+    def write_many(self, values, outPutFile=None):
+        """
+        Write a batch of data points to the tLSM structure, which is the same as writing them one by one
+        :param values: an array of generate times of the data points, in arrival order
+        """
+        values = np.asarray(values, dtype=np.float64)
+        start = 0
+        while start < len(values):
+            # split the data points until one of the buffers is full
+            segment_length, is_sequential = next_flush_segment(
+                values[start:], self.max_generate_time_on_level_1,
+                self.sequential_buffer_size - len(self.sequential_buffer),
+                self.nonsequential_buffer_size - len(self.nonsequential_buffer))
+            segment = values[start:start + segment_length]
+            start += segment_length
+            nonsequential_number = segment_length - int(np.count_nonzero(is_sequential))
+
+            self.points_number_in_a_cycle += segment_length
+            self.nonsequential_point_number_when_sequential_buffer_is_full += nonsequential_number
+            self.sequential_buffer.extend(segment[is_sequential].tolist())
+            self.nonsequential_buffer.extend(segment[~is_sequential].tolist())
+            if len(self.sequential_buffer) == self.sequential_buffer_size:
+                self.__write_sequential_buffer()
+                if nonsequential_number == 0:
+                    # the data points are arriving in order, try to skip buffering the following ones
+                    start += self.__write_sequential_stretch(values[start:])
+            if len(self.nonsequential_buffer) == self.nonsequential_buffer_size:
+                self.__write_nonsequential_buffer(outPutFile)
+
+    def __write_sequential_stretch(self, values, max_sstable_number=64):
+        """
+        Write the leading fully sequential stretch of a batch of data points to LEVEL1 directly, which must be called
+        when the sequential buffer is empty. If every data point is sequential, the sequential buffer is flushed every
+        sequential_buffer_size data points, and the maximal generate time on LEVEL1 before each flush is the running
+        maximum of the previous flushes. The stretch ends at the first chunk of sequential_buffer_size data points that
+        is not fully above that running maximum.
+        :param values: an array of generate times of the data points, in arrival order
+        :param max_sstable_number: maximal number of sequential sstables to emit in one step
+        :return: the number of data points written
+        """
+        sstable_number = min(len(values) // self.sequential_buffer_size, max_sstable_number)
+        if sstable_number == 0:
+            return 0
+        chunks = values[:sstable_number * self.sequential_buffer_size].reshape(sstable_number, -1)
+        # maximal generate time on LEVEL1 when each chunk is written to the sequential buffer
+        thresholds = np.maximum.accumulate(
+            np.concatenate(([self.max_generate_time_on_level_1], chunks.max(axis=1))))[:sstable_number]
+        is_sequential = (chunks > thresholds[:, np.newaxis]).all(axis=1)
+        sstable_number = sstable_number if is_sequential.all() else int(np.argmin(is_sequential))
+        if sstable_number == 0:
+            return 0
+
+        # form all the sequential sstables in one step, the write number of each data point is initialized as 1
+        chunks = np.sort(chunks[:sstable_number], axis=1)
+        for data_points in chunks:
+            self.level_1.append(form_sstable(data_points, 1, self.metrics_only))
+        self.max_generate_time_on_level_1 = chunks[-1, -1]
+        self.write_times += chunks.size
+        self.level_1_write_times += chunks.size
+        self.points_number_in_a_cycle += chunks.size
+
+        # update observed records as if the sequential buffer is flushed sstable_number times
+        self.sequential_buffer_flush_times_per_cycle += sstable_number
+        self.history_nonsequential_point_number_when_sequential_buffer_if_full.append(
+            self.nonsequential_point_number_when_sequential_buffer_is_full)
+        self.history_nonsequential_point_number_when_sequential_buffer_if_full.extend([0] * (sstable_number - 1))
+        self.nonsequential_point_number_when_sequential_buffer_is_full = 0
+        return chunks.size
+
     def __write_nonsequential_buffer(self, outputFile=None):
         """
         Write the content inside nonsequential buffer to LEVEL1, and finally clear the nonsequential buffer
@@ -117,13 +197,9 @@ class tLSM:
                 outputFile.write(str(self.nonsequential_buffer)+'\n')
 
             # retrieve the content inside nonsequential buffer
-            data_point_list = self.nonsequential_buffer.copy()
-            data_point_list.sort()
-            pairs = []
-            for i in data_point_list:
-                pairs.append([i, 0])
+            data_points = np.sort(np.array(self.nonsequential_buffer, dtype=np.float64))
             # form a new sstable
-            sstable = SSTable(pairs, data_point_list[0], data_point_list[len(data_point_list) - 1], 0)
+            sstable = form_sstable(data_points, 0, self.metrics_only)
             # merge the new sstable to LEVEL1
             self.__merge(sstable)
             self.nonsequential_buffer.clear()
@@ -140,17 +216,13 @@ class tLSM:
         Write the content inside sequential buffer to LEVEL1, and finally clear the sequential buffer
         """
         if len(self.sequential_buffer) > 0:
-            data_point_list = self.sequential_buffer.copy()
-            data_point_list.sort()
-            pairs = []
-            for i in data_point_list:
-                # Because the sstable is directly write to LEVEL1, the write number of each data point is initialized
-                # as 1
-                pairs.append([i, 1])
-            sstable = SSTable(pairs, data_point_list[0], data_point_list[len(data_point_list) - 1], 0, False)
-            self.max_generate_time_on_level_1 = data_point_list[len(data_point_list) - 1]
+            data_points = np.sort(np.array(self.sequential_buffer, dtype=np.float64))
+            # Because the sstable is directly write to LEVEL1, the write number of each data point is initialized as 1
+            sstable = form_sstable(data_points, 1, self.metrics_only)
+            self.max_generate_time_on_level_1 = data_points[-1]
             # append the new sstable to the tail of LEVEL1 directly, without merge
-            self.write_times += len(sstable.data_list)
+            self.write_times += len(sstable)
+            self.level_1_write_times += len(sstable)
             self.level_1.append(sstable)
             self.sequential_buffer.clear()
 
@@ -167,19 +239,10 @@ class tLSM:
         """
         # record the sstables need to participate in merge sort
         # because this method is called when nonsequential buffer if to be flushed, merge_list cannot be empty
-        merge_list = []
-        # iterate the sstables in LEVEL1 from tail (with later generate time) to head (with earlier generate time)
-        # to check whether it has overlapped generate time range with the new sstable
-        while len(self.level_1) > 0:
-            last_sstable = self.level_1.pop()
-            if last_sstable.max_val > new_sstable.min_val:
-                # overlapped generate time range exists, remove it from LEVEL1 and append the sstable to the list
-                merge_list.append(last_sstable)
-            else:
-                # current sstable has no overlap generate time range with the new sstable
-                # put it back to the tail of LEVEL1
-                self.level_1.append(last_sstable)
-                break
+        # the sstables on LEVEL1 which have overlapped generate time range with the new sstable are found by binary
+        # search, and removed from LEVEL1 in one slice, ordered from tail (with later generate time) to head (with
+        # earlier generate time)
+        merge_list = self.level_1.pop_overlapped(new_sstable.min_val)
 
         # collect statistical data
         merge_sorted_sstable_number, direct_flushed_sstable_number, merge_sorted_points_number, \
@@ -194,7 +257,10 @@ class tLSM:
         # the at the end of LEVEL1
         merge_list.append(new_sstable)
         self.write_times += count_point(merge_list)
-        self.level_1.extend(merge_sort(merge_list, self.sstable_size))
+        if len(merge_list) > 1:
+            # the data points are written once more by merge sort, otherwise the new sstable is kept as it is
+            self.level_1_write_times += count_point(merge_list)
+        self.level_1.extend(merge_sort(merge_list, self.sstable_size, self.merge_method))
 
     def get_write_amplification(self):
         """
@@ -206,8 +272,12 @@ class tLSM:
         # totally how many points
         point_number = 0
         for sstable in self.level_1:
-            point_number += len(sstable.data_list)
-            write_times += sstable.get_write_times()
+            point_number += len(sstable)
+            if not self.metrics_only:
+                write_times += sstable.get_write_times()
+        if self.metrics_only:
+            # the sstables do not record write times, use the sum collected during writing
+            write_times = self.level_1_write_times
         return point_number, write_times
 
     def flush(self):
@@ -24,9 +24,8 @@ if __name__ == '__main__':
     lsm = LSM(arg_buffer_size)
     tlsm = tLSM(arg_seq_buffer_size, arg_nonseq_buffer_size)
 
-    for point in data_points:
-        lsm.write(point)
-        tlsm.write(point)
+    lsm.write_many(data_points)
+    tlsm.write_many(data_points)
 
     lsm_info = r'$\Delta t$=' + str(arg_interval) + ', $n$=' + str(arg_buffer_size)
     tlsm_info = r'$\Delta t$=' + str(arg_interval) + ', $n_1$=' + str(arg_seq_buffer_size) + ', $n_2$=' + str(
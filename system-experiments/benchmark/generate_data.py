@@ -0,0 +1,69 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+# the data points are generated by data-generation/point_generation.py, the same as data_prepare_iotdb_ty.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data-generation'))
+from point_generation import job_rng, prepare_data
+
+
+def parse_job(text):
+    """
+    Parse a data generation job
+    :param text: <number of data points>:<time interval>, e.g., 10000000:50
+    :return: a tuple of <number of data points, time interval>
+    """
+    data_points_number, time_interval = text.split(':')
+    return int(data_points_number), int(time_interval)
+
+
+def run_job(job, output_formats, seed, delay_path):
+    """
+    Execute a data generation job, the output file is data_for_iotdb_ty_<number of data points>_<time interval>
+    :param job: a tuple of <number of data points, time interval>
+    :param output_formats: output formats, csv and/or bin
+    :param seed: the seed shared by all the jobs
+    :param delay_path: path of the delay file
+    :return: the job, number of data points written, number of data points dropped, and the time cost in seconds
+    """
+    data_points_number, time_interval = job
+    output_file_name = 'data_for_iotdb_ty_' + str(data_points_number) + '_' + str(time_interval)
+    start = time.perf_counter()
+    current_num, dropped_num = prepare_data(data_points_number, time_interval, output_file_name, output_formats,
+                                            job_rng(data_points_number, time_interval, seed), delay_path,
+                                            show_progress=False)
+    return job, current_num, dropped_num, time.perf_counter() - start
+
+
+def run_job_arguments(arguments):
+    return run_job(*arguments)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Generate data files for the benchmark on a pool of processes')
+    parser.add_argument('jobs', nargs='+', type=parse_job,
+                        help='data generation jobs, each of them is <number of data points>:<time interval>')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='number of processes, the number of CPUs by default')
+    parser.add_argument('--formats', default='csv,bin', help='output formats, csv and/or bin, separated by comma')
+    parser.add_argument('--seed', type=int, default=4834, help='the seed shared by all the jobs')
+    parser.add_argument('--delay-path', default='ty.txt', help='path of the delay file')
+    args = parser.parse_args()
+
+    output_formats = args.formats.split(',')
+    process_num = os.cpu_count() if args.processes is None else args.processes
+    job_arguments = [(job, output_formats, args.seed, args.delay_path) for job in args.jobs]
+    with multiprocessing.Pool(min(process_num, len(job_arguments))) as pool:
+        # a process takes the next job as soon as it finishes the previous one
+        for job, current_num, dropped_num, cost in pool.imap_unordered(run_job_arguments, job_arguments):
+            data_points_number, time_interval = job
+            print('data_points_number=' + str(data_points_number),
+                  'time_interval=' + str(time_interval),
+                  'written_number=' + str(current_num),
+                  'dropped_number=' + str(dropped_num),
+                  'job_cost=' + str(cost),
+                  'throughput=' + str(current_num / cost))
+            sys.stdout.flush()
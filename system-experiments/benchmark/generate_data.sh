@@ -1,5 +1 @@
-nohup python data_prepare_iotdb_ty.py 1000000 50 > data_prepare_iotdb_ty_1000000_50.log &
-nohup python data_prepare_iotdb_ty.py 1000000 100 > data_prepare_iotdb_ty_1000000_100.log &
-nohup python data_prepare_iotdb_ty.py 1000000 500 > data_prepare_iotdb_ty_1000000_500.log &
-nohup python data_prepare_iotdb_ty.py 1000000 1000 > data_prepare_iotdb_ty_1000000_1000.log &
-nohup python data_prepare_iotdb_ty.py 1000000 5000 > data_prepare_iotdb_ty_1000000_5000.log &
+nohup python generate_data.py 1000000:50 1000000:100 1000000:500 1000000:1000 1000000:5000 > generate_data.log &
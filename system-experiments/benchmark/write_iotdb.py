@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+
+import numpy as np
+from iotdb.Session import Session
+from iotdb.utils.IoTDBConstants import TSDataType
+
+# the binary data point format is defined once in data-generation/binary_points.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data-generation'))
+from binary_points import read_points
+
+# two double time series per data point like write_iotdb-1.0-SNAPSHOT.jar, which writes the delay under the name value
+MEASUREMENTS = ['arrival_time', 'delay']
+DATA_TYPES = [TSDataType.DOUBLE, TSDataType.DOUBLE]
+
+
+def load_points(path):
+    """
+    Load the data points of a binary data point file (.bin), or of a csv file of <arrival time, generate time, delay>
+    :param path: path of the file
+    :return: arrays of arrival time, generate time and delay, in arrival order
+    """
+    if path.endswith('.csv'):
+        points = np.loadtxt(path, dtype=np.int64, delimiter=',', ndmin=2)
+        return points[:, 0], points[:, 1], points[:, 2]
+    points = read_points(path)
+    return points['arrival_time'], points['generate_time'], points['delay']
+
+
+def write_points(session, device_id, arrival_times, generate_times, delays, batch_size=10000):
+    """
+    Write data points to IoTDB in arrival order, the timestamp of a data point is its generate time. Like
+    write_iotdb-1.0-SNAPSHOT.jar, the arrival time and the third column of the data file, i.e., the delay, are written,
+    as the measurements arrival_time and delay.
+    :param session: an opened session
+    :param device_id: the device to write
+    :param arrival_times: an array of arrival times
+    :param generate_times: an array of generate times
+    :param delays: an array of delays
+    :param batch_size: number of data points sent in a request
+    """
+    for start in range(0, len(generate_times), batch_size):
+        end = min(start + batch_size, len(generate_times))
+        number = end - start
+        values = np.column_stack((arrival_times[start:end], delays[start:end])).astype(np.float64).tolist()
+        session.insert_records([device_id] * number, generate_times[start:end].tolist(), [MEASUREMENTS] * number,
+                               [DATA_TYPES] * number, values)
+
+
+if __name__ == '__main__':
+
+    host, port, storage_group, data_file_name = sys.argv[1:5]
+
+    session = Session(host, port, 'root', 'root')
+    session.open(False)
+    start_time = time.time()
+    arrival_times, generate_times, delays = load_points(data_file_name)
+    write_points(session, storage_group + '.device', arrival_times, generate_times, delays)
+    session.close()
+    print('write', len(generate_times), 'data points in', time.time() - start_time, 's')